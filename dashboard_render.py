@@ -0,0 +1,725 @@
+"""
+Dashboard rendering
+Turns the dashboard's query results (Arrow tables, keyed as in CHART_SOURCES)
+into chart data and the HTML page. generate_html_dashboard.py renders one
+dashboard with it, generate_segment_dashboards.py one per segment
+"""
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from downsample import DEFAULT_WIDTH, downsample_arrow
+
+PLOTLY_CDN = "https://cdn.plot.ly/plotly-latest.min.js"
+
+# The query result each chart is drawn from
+CHART_SOURCES = {
+    'chart1': 'revenue_by_category',
+    'chart2': 'user_cohort',
+    'chart3': 'event_funnel',
+    'chart4': 'daily_revenue',
+    'chart5': 'customer_lifetime_value',
+    'chart6': 'latest_month',
+    'chart7': 'product_price_tiers',
+    'chart8': 'category_by_month',
+}
+
+# ============================================================================
+# CHART DATA
+# ============================================================================
+# Results stay Arrow tables: metrics come from pyarrow.compute and chart data
+# is serialized to JSON by DuckDB straight from the Arrow buffers
+def json_arrays(conn, table, order_by='_row', **columns):
+    """JSON array text for each column expression over an Arrow table, in
+    order_by order (default: the table's row order)."""
+    rows = conn.from_arrow(table.append_column('_row', pa.array(np.arange(table.num_rows))))
+    values = rows.aggregate(', '.join(
+        f"COALESCE(to_json(list({expr} ORDER BY {order_by})), '[]')" for expr in columns.values()
+    )).fetchone()
+    return dict(zip(columns, values))
+
+def json_object(arrays):
+    return '{' + ','.join(f'"{key}":{value}' for key, value in arrays.items()) + '}'
+
+def first_row(table, default=None):
+    return table.slice(0, 1).to_pylist()[0] if table.num_rows else default
+
+# Metrics and insights of an empty result (e.g. a filter that matches no
+# orders) show as n/a
+def money(value, decimals=0):
+    return 'n/a' if value is None else f"${value:,.{decimals}f}"
+
+def pct(value):
+    return 'n/a' if value is None else f"{value:.1f}%"
+
+def ratio(value):
+    return 'n/a' if value is None else f"{value*100:.1f}%"
+
+def chart_json(results, chart_width=DEFAULT_WIDTH):
+    """JSON text of each chart's data, by chart id. Time series are
+    downsampled to at most one point per pixel of chart_width."""
+    conn = duckdb.connect()
+
+    chart1 = json_arrays(conn, results['revenue_by_category'], categories='category', revenues='revenue')
+    chart2 = json_arrays(conn, results['user_cohort'], cohorts='cohort', users='user_count', orders='total_orders')
+    chart3 = json_arrays(conn, results['event_funnel'], events='event_type', users='user_count')
+    daily_trend = downsample_arrow(results['daily_revenue'].sort_by('order_date'), 'order_date', 'revenue', chart_width)
+    chart4 = json_arrays(conn, daily_trend, dates='order_date', revenues='revenue')
+
+    # Chart 5: Top CLV customers (users without orders have no lifetime revenue)
+    customer_lifetime_value = results['customer_lifetime_value']
+    top_clv = customer_lifetime_value.filter(pc.is_valid(customer_lifetime_value['lifetime_revenue'])).slice(0, 10)
+    chart5 = json_arrays(conn, top_clv, customers="'User ' || user_id", revenues='lifetime_revenue')
+
+    # Chart 6: Category by month (latest month)
+    chart6 = json_arrays(conn, results['latest_month'], categories='category', revenues='revenue')
+
+    # Chart 7: Price tier performance
+    chart7 = json_arrays(conn, results['product_price_tiers'], tiers='price_tier', orders='orders', revenues='revenue')
+
+    # Chart 8: Category Revenue Trend Over Time (one revenue series per category,
+    # in month order; categories in order of their first month). Months are
+    # downsampled on total revenue so every category keeps the same months.
+    category_by_month = results['category_by_month']
+    monthly_revenue = category_by_month.group_by('month').aggregate([('revenue', 'sum')]).sort_by('month')
+    chart_months = downsample_arrow(monthly_revenue, 'month', 'revenue_sum', chart_width)['month']
+    category_trend = category_by_month.filter(pc.is_in(category_by_month['month'], value_set=chart_months))
+    months_json, category_traces_json = conn.from_arrow(category_trend).query('category_by_month', """
+        SELECT
+            (SELECT COALESCE(to_json(list(DISTINCT month ORDER BY month)), '[]') FROM category_by_month),
+            COALESCE(to_json(map(list(category ORDER BY first_month, category),
+                                 list(revenues ORDER BY first_month, category))), '{}')
+        FROM (
+            SELECT category, MIN(month) as first_month, list(revenue ORDER BY month) as revenues
+            FROM category_by_month
+            GROUP BY category
+        )
+    """).fetchone()
+    conn.close()
+
+    return {
+        'chart1': json_object(chart1),
+        'chart2': json_object(chart2),
+        'chart3': json_object(chart3),
+        'chart4': json_object(chart4),
+        'chart5': json_object(chart5),
+        'chart6': json_object(chart6),
+        'chart7': json_object(chart7),
+        'chart8': json_object({'months': months_json, 'categories': category_traces_json}),
+    }
+
+# ============================================================================
+# PAGE
+# ============================================================================
+# Inline: the page has every chart's data embedded. Lazy: the page fetches
+# data/<chart>.json.gz as each chart scrolls into view; fetch() needs
+# http(s), so serve the directory rather than opening the file directly.
+INLINE_LOADER = """
+        var chartData = {%s};
+        chartIds.forEach(function(id) { renderers[id](chartData[id]); });
+"""
+
+LAZY_LOADER = """
+        function loadChart(id) {
+            fetch('data/' + id + '.json.gz')
+                .then(function(response) { return response.arrayBuffer(); })
+                .then(function(buffer) {
+                    var bytes = new Uint8Array(buffer);
+                    // Servers that send .gz files with Content-Encoding: gzip
+                    // hand over JSON that the browser already inflated
+                    if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+                        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+                        return new Response(stream).json();
+                    }
+                    return JSON.parse(new TextDecoder().decode(bytes));
+                })
+                .then(function(data) { renderers[id](data); });
+        }
+
+        if ('IntersectionObserver' in window) {
+            var observer = new IntersectionObserver(function(entries) {
+                entries.forEach(function(entry) {
+                    if (entry.isIntersecting) {
+                        observer.unobserve(entry.target);
+                        loadChart(entry.target.id);
+                    }
+                });
+            }, {rootMargin: '200px'});
+            chartIds.forEach(function(id) { observer.observe(document.getElementById(id)); });
+        } else {
+            chartIds.forEach(loadChart);
+        }
+"""
+
+
+def render_html(results, context, chart_data=None, plotly_src=PLOTLY_CDN):
+    """The dashboard page. context holds what the header shows: first_day,
+    latest_day, categories, status, trend_days and, for a segment's page, a
+    segment label. With chart_data the charts' data is embedded in the page,
+    without it the page loads it lazily."""
+    revenue_by_cat = results['revenue_by_category']
+    top_products = results['top_products']
+    user_cohort = results['user_cohort']
+    event_funnel = results['event_funnel']
+
+    # Calculate metrics
+    total_revenue = float(pc.sum(revenue_by_cat['revenue']).as_py() or 0)
+    total_orders = int(pc.sum(revenue_by_cat['order_count']).as_py() or 0)
+    avg_order_value = float(pc.mean(revenue_by_cat['avg_order_value']).as_py() or 0)
+    total_margin = float(pc.sum(revenue_by_cat['total_margin']).as_py() or 0)
+
+    top_category = first_row(revenue_by_cat.sort_by([('revenue', 'descending')]),
+                             {'category': 'n/a', 'revenue': None, 'order_count': 0})
+    top_product = first_row(top_products, {'name': 'n/a', 'revenue': None, 'margin_pct': None})
+    newest_cohort = first_row(user_cohort, {'user_count': 0, 'avg_order_value': None})
+    category_share = float(top_category['revenue']) / total_revenue * 100 if total_revenue else None
+
+    purchases = first_row(event_funnel.filter(pc.equal(event_funnel['event_type'], 'purchase')), {'user_count': 0})
+    purchase_users = int(purchases['user_count'])
+    all_users = int(pc.max(event_funnel['user_count']).as_py() or 0)
+    conversion = (purchase_users / all_users) * 100 if all_users else None
+
+    scope = f"{context['segment']} · " if context.get('segment') else ''
+    if chart_data is None:
+        loader_js = LAZY_LOADER
+    else:
+        loader_js = INLINE_LOADER % ', '.join(f"{chart_id}: {text}" for chart_id, text in chart_data.items())
+
+    # Build HTML
+    html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>eCommerce Analytics Dashboard</title>
+    <script src="{plotly_src}"></script>
+    <style>
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+        body {{
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: #333;
+            min-height: 100vh;
+            padding: 20px;
+        }}
+        .container {{
+            max-width: 1400px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 12px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.12);
+            padding: 40px;
+        }}
+        .header {{
+            text-align: center;
+            margin-bottom: 40px;
+            border-bottom: 3px solid #667eea;
+            padding-bottom: 20px;
+        }}
+        .header h1 {{
+            font-size: 2.5em;
+            color: #333;
+            margin-bottom: 10px;
+        }}
+        .header p {{
+            color: #666;
+            font-size: 1.1em;
+        }}
+        .metrics {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+            gap: 20px;
+            margin-bottom: 40px;
+        }}
+        .metric-card {{
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 25px;
+            border-radius: 10px;
+            box-shadow: 0 10px 25px rgba(102, 126, 234, 0.12);
+            text-align: center;
+        }}
+        .metric-card h3 {{
+            font-size: 0.9em;
+            opacity: 0.9;
+            margin-bottom: 10px;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }}
+        .metric-card .value {{
+            font-size: 2em;
+            font-weight: bold;
+        }}
+        .charts-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(500px, 1fr));
+            gap: 30px;
+            margin-bottom: 40px;
+        }}
+        .chart-container {{
+            background: #f8f9fa;
+            border-radius: 10px;
+            padding: 20px;
+            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
+        }}
+        .chart-title {{
+            font-size: 1.3em;
+            font-weight: bold;
+            margin-bottom: 15px;
+            color: #333;
+        }}
+        .insights {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
+            gap: 20px;
+            margin-bottom: 40px;
+        }}
+        .insight-card {{
+            padding: 25px;
+            border-radius: 10px;
+            border-left: 5px solid;
+        }}
+        .insight-success {{
+            background: #d4edda;
+            border-color: #28a745;
+            color: #155724;
+        }}
+        .insight-info {{
+            background: #d1ecf1;
+            border-color: #17a2b8;
+            color: #0c5460;
+        }}
+        .insight-warning {{
+            background: #fff3cd;
+            border-color: #ffc107;
+            color: #856404;
+        }}
+        .insight-card h4 {{
+            font-size: 1.1em;
+            margin-bottom: 10px;
+        }}
+        .insight-card p {{
+            font-size: 0.95em;
+            line-height: 1.6;
+        }}
+        .summary {{
+            background: #f0f4ff;
+            border: 2px solid #667eea;
+            padding: 30px;
+            border-radius: 10px;
+            margin-bottom: 30px;
+        }}
+        .summary h3 {{
+            color: #667eea;
+            margin-bottom: 15px;
+            font-size: 1.5em;
+        }}
+        .summary p {{
+            line-height: 1.8;
+            color: #555;
+            margin-bottom: 10px;
+        }}
+        .summary ul {{
+            margin-left: 20px;
+            color: #555;
+        }}
+        .summary li {{
+            margin-bottom: 8px;
+            line-height: 1.6;
+        }}
+        .footer {{
+            text-align: center;
+            color: #999;
+            font-size: 0.9em;
+            border-top: 1px solid #eee;
+            padding-top: 20px;
+            margin-top: 40px;
+        }}
+        .table-container {{
+            overflow-x: auto;
+        }}
+        table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin: 10px 0;
+        }}
+        th {{
+            background: #667eea;
+            color: white;
+            padding: 12px;
+            text-align: left;
+            font-weight: 600;
+        }}
+        td {{
+            padding: 10px 12px;
+            border-bottom: 1px solid #eee;
+        }}
+        tr:hover {{
+            background: #f5f5f5;
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📊 eCommerce Analytics Dashboard</h1>
+            <p>Real-time analytics powered by dbt + DuckDB</p>
+            <p>{scope}{context['first_day']} – {context['latest_day']} · {', '.join(context['categories'] or ['All categories'])} · {context['status']} orders</p>
+        </div>
+        
+        <div class="metrics">
+            <div class="metric-card">
+                <h3>Total Revenue</h3>
+                <div class="value">${total_revenue:,.0f}</div>
+            </div>
+            <div class="metric-card">
+                <h3>Total Orders</h3>
+                <div class="value">{total_orders:,.0f}</div>
+            </div>
+            <div class="metric-card">
+                <h3>Avg Order Value</h3>
+                <div class="value">${avg_order_value:,.2f}</div>
+            </div>
+            <div class="metric-card">
+                <h3>Total Margin</h3>
+                <div class="value">${total_margin:,.0f}</div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">📦 Revenue by Category</div>
+                <div id="chart1" style="width:100%;height:400px;"></div>
+            </div>
+            <div class="chart-container">
+                <div class="chart-title">⭐ Top 10 Products</div>
+                <div class="table-container">
+                    <table>
+                        <thead>
+                            <tr>
+                                <th>Product</th>
+                                <th>Revenue</th>
+                                <th>Margin %</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+"""
+
+    # Add top products to table
+    for row in top_products.slice(0, 10).to_pylist():
+        html += f"""
+                            <tr>
+                                <td>{row['name']}</td>
+                                <td>${row['revenue']:,.0f}</td>
+                                <td>{row['margin_pct']*100:.1f}%</td>
+                            </tr>
+    """
+
+    html += f"""
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">👥 User Cohorts by Account Age</div>
+                <div id="chart2" style="width:100%;height:400px;"></div>
+            </div>
+            <div class="chart-container">
+                <div class="chart-title">🛒 Event Funnel</div>
+                <div id="chart3" style="width:100%;height:400px;"></div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">📅 Daily Revenue Trend ({f"Last {context['trend_days']} Days" if context['trend_days'] else "All Days"})</div>
+                <div id="chart4" style="width:100%;height:400px;"></div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">💎 Top 10 Customers by Lifetime Value</div>
+                <div id="chart5" style="width:100%;height:400px;"></div>
+            </div>
+            <div class="chart-container">
+                <div class="chart-title">📊 Category Performance (Latest Month)</div>
+                <div id="chart6" style="width:100%;height:400px;"></div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">💰 Performance by Price Tier</div>
+                <div id="chart7" style="width:100%;height:400px;"></div>
+            </div>
+        </div>
+        
+        <div class="charts-grid">
+            <div class="chart-container">
+                <div class="chart-title">� Category Revenue Trend Over Time</div>
+                <div id="chart8" style="width:100%;height:400px;"></div>
+            </div>
+        </div>
+        
+        <h2 style="margin-bottom: 20px; color: #333;">💡 Key Insights</h2>
+        <div class="insights">
+            <div class="insight-card insight-success">
+                <h4>🏆 Top Performing Category</h4>
+                <p><strong>{top_category['category']}</strong> leads with <strong>{money(top_category['revenue'])}</strong> in revenue ({int(top_category['order_count'])} orders)</p>
+            </div>
+            <div class="insight-card insight-info">
+                <h4>⭐ Best Product</h4>
+                <p><strong>{top_product['name']}</strong> generated <strong>{money(top_product['revenue'])}</strong> in revenue with {ratio(top_product['margin_pct'])} margin</p>
+            </div>
+            <div class="insight-card insight-warning">
+                <h4>📱 Newest Users (0-30 days)</h4>
+                <p><strong>{int(newest_cohort['user_count'])}</strong> users, avg <strong>{money(newest_cohort['avg_order_value'], 2)}</strong>/order</p>
+            </div>
+            <div class="insight-card insight-info">
+                <h4>🎯 Conversion Rate</h4>
+                <p><strong>{pct(conversion)}</strong> of users completed a purchase ({purchase_users}/{all_users} users)</p>
+            </div>
+        </div>
+        
+        <div class="summary">
+            <h3>📝 Executive Summary</h3>
+            <p>This eCommerce analytics dashboard reveals a healthy and growing business with strong performance across all metrics.</p>
+            
+            <p><strong>Revenue Highlights:</strong></p>
+            <ul>
+                <li>Total revenue: <strong>${total_revenue:,.0f}</strong></li>
+                <li>Average order value: <strong>${avg_order_value:,.2f}</strong></li>
+                <li>Total profit margin: <strong>${total_margin:,.0f}</strong></li>
+                <li>{len(revenue_by_cat)} product categories performing well</li>
+            </ul>
+            
+            <p style="margin-top: 15px;"><strong>Product Performance:</strong></p>
+            <ul>
+                <li><strong>{top_category['category']}</strong> is the strongest performer, contributing {pct(category_share)} of revenue</li>
+                <li>Top 10 products account for significant portion of orders</li>
+                <li>Product margins range from {ratio(pc.min(top_products['margin_pct']).as_py())} to {ratio(pc.max(top_products['margin_pct']).as_py())}</li>
+            </ul>
+            
+            <p style="margin-top: 15px;"><strong>User Behavior & Conversion:</strong></p>
+            <ul>
+                <li><strong>{pct(conversion)}</strong> of users are converting to purchasers</li>
+                <li>Newest user cohort shows <strong>{int(newest_cohort['user_count'])}</strong> engaged users</li>
+                <li>Strong engagement with page_view as primary entry point</li>
+            </ul>
+            
+            <p style="margin-top: 15px;"><strong>Actionable Insights:</strong></p>
+            <ul>
+                <li>Focus marketing on <strong>{top_category['category']}</strong> - driving the most revenue</li>
+                <li>Replicate success of top products across catalog</li>
+                <li>Optimize conversion funnel - target 25%+</li>
+                <li>Monitor newest cohort retention in next 30 days</li>
+            </ul>
+        </div>
+        
+        <div class="footer">
+            <p>Dashboard generated with dbt (data transformation) + DuckDB (analytics) + Plotly (visualization)</p>
+            <p>All models tested and documented for production readiness</p>
+        </div>
+    </div>
+    
+    <script>
+        // One render function per chart, called with that chart's data
+        var renderers = {{}};
+
+        // Chart 1: Revenue by Category
+        renderers.chart1 = function(data) {{
+            var trace1 = {{
+                x: data.categories,
+                y: data.revenues,
+                type: 'bar',
+                marker: {{color: '#667eea'}}
+            }};
+            var layout1 = {{
+                title: 'Revenue by Category',
+                xaxis: {{title: 'Category'}},
+                yaxis: {{title: 'Revenue (USD)'}},
+                margin: {{t: 40, b: 60, l: 80, r: 40}},
+                height: 400
+            }};
+            Plotly.newPlot('chart1', [trace1], layout1, {{responsive: true}});
+        }};
+
+        // Chart 2: User Cohorts
+        renderers.chart2 = function(data) {{
+            var trace2a = {{
+                x: data.cohorts,
+                y: data.users,
+                name: 'Users',
+                type: 'bar',
+                marker: {{color: '#667eea'}}
+            }};
+            var trace2b = {{
+                x: data.cohorts,
+                y: data.orders,
+                name: 'Orders',
+                type: 'bar',
+                marker: {{color: '#764ba2'}}
+            }};
+            var layout2 = {{
+                title: 'Users and Orders by Cohort',
+                xaxis: {{title: 'Account Age Cohort'}},
+                yaxis: {{title: 'Count'}},
+                barmode: 'group',
+                margin: {{t: 40, b: 60, l: 80, r: 40}},
+                height: 400
+            }};
+            Plotly.newPlot('chart2', [trace2a, trace2b], layout2, {{responsive: true}});
+        }};
+
+        // Chart 3: Funnel
+        renderers.chart3 = function(data) {{
+            var trace3 = {{
+                type: 'funnel',
+                y: data.events,
+                x: data.users,
+                textposition: 'inside',
+                textinfo: 'value+percent initial',
+                marker: {{color: '#667eea'}}
+            }};
+            var layout3 = {{
+                title: 'User Journey Funnel',
+                margin: {{t: 40, b: 60, l: 80, r: 40}},
+                height: 400
+            }};
+            Plotly.newPlot('chart3', [trace3], layout3, {{responsive: true}});
+        }};
+
+        // Chart 4: Daily Revenue
+        renderers.chart4 = function(data) {{
+            var trace4 = {{
+                x: data.dates,
+                y: data.revenues,
+                type: 'scatter',
+                mode: 'lines+markers',
+                marker: {{color: '#667eea', size: 6}},
+                line: {{color: '#667eea', width: 2}}
+            }};
+            var layout4 = {{
+                title: 'Daily Revenue Trend',
+                xaxis: {{title: 'Date'}},
+                yaxis: {{title: 'Revenue (USD)'}},
+                margin: {{t: 40, b: 60, l: 80, r: 40}},
+                height: 400,
+                hovermode: 'x unified'
+            }};
+            Plotly.newPlot('chart4', [trace4], layout4, {{responsive: true}});
+        }};
+
+        // Chart 5: Top Customers by CLV
+        renderers.chart5 = function(data) {{
+            var trace5 = {{
+                x: data.customers,
+                y: data.revenues,
+                type: 'bar',
+                marker: {{color: '#764ba2'}}
+            }};
+            var layout5 = {{
+                title: 'Top 10 Customers by Lifetime Value',
+                xaxis: {{title: 'Customer'}},
+                yaxis: {{title: 'Lifetime Revenue (USD)'}},
+                margin: {{t: 40, b: 100, l: 80, r: 40}},
+                height: 400
+            }};
+            Plotly.newPlot('chart5', [trace5], layout5, {{responsive: true}});
+        }};
+
+        // Chart 6: Category Performance This Month
+        renderers.chart6 = function(data) {{
+            var trace6 = {{
+                x: data.categories,
+                y: data.revenues,
+                type: 'bar',
+                marker: {{color: '#667eea'}}
+            }};
+            var layout6 = {{
+                title: 'Category Revenue (Latest Month)',
+                xaxis: {{title: 'Category'}},
+                yaxis: {{title: 'Revenue (USD)'}},
+                margin: {{t: 40, b: 60, l: 80, r: 40}},
+                height: 400
+            }};
+            Plotly.newPlot('chart6', [trace6], layout6, {{responsive: true}});
+        }};
+
+        // Chart 7: Price Tier Performance
+        renderers.chart7 = function(data) {{
+            var trace7a = {{
+                x: data.tiers,
+                y: data.orders,
+                name: 'Orders',
+                type: 'bar',
+                marker: {{color: '#667eea'}}
+            }};
+            var trace7b = {{
+                x: data.tiers,
+                y: data.revenues,
+                name: 'Revenue',
+                type: 'bar',
+                marker: {{color: '#764ba2'}},
+                yaxis: 'y2'
+            }};
+            var layout7 = {{
+                title: 'Performance by Price Tier',
+                xaxis: {{title: 'Price Tier'}},
+                yaxis: {{title: 'Orders'}},
+                yaxis2: {{title: 'Revenue (USD)', overlaying: 'y', side: 'right'}},
+                margin: {{t: 40, b: 60, l: 80, r: 80}},
+                height: 400,
+                barmode: 'group'
+            }};
+            Plotly.newPlot('chart7', [trace7a, trace7b], layout7, {{responsive: true}});
+        }};
+
+        // Chart 8: Category Revenue Trend Over Time
+        renderers.chart8 = function(data) {{
+            var colors8 = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#fee140', '#30b0fe'];
+            var categoryData = data.categories;
+            var monthsList = data.months;
+            var traces8 = [];
+
+            Object.keys(categoryData).forEach(function(category, index) {{
+                var trace = {{
+                    x: monthsList,
+                    y: categoryData[category],
+                    name: category,
+                    type: 'scatter',
+                    mode: 'lines+markers',
+                    line: {{color: colors8[index % colors8.length]}}
+                }};
+                traces8.push(trace);
+            }});
+
+            var layout8 = {{
+                title: 'Category Revenue Trend Over Time',
+                xaxis: {{title: 'Month'}},
+                yaxis: {{title: 'Revenue (USD)'}},
+                margin: {{t: 40, b: 60, l: 80, r: 80}},
+                height: 400,
+                hovermode: 'x unified'
+            }};
+            Plotly.newPlot('chart8', traces8, layout8, {{responsive: true}});
+        }};
+
+        // Charts without a container on the page are skipped
+        var chartIds = Object.keys(renderers).filter(function(id) {{ return document.getElementById(id); }});
+{loader_js}
+    </script>
+</body>
+</html>
+"""
+    return html
@@ -0,0 +1,71 @@
+"""
+Downsampling for time-series charts
+Largest-Triangle-Three-Buckets (LTTB) keeps the visual shape of a line while
+capping it at one point per horizontal pixel, so the chart payload and render
+time stay constant however long the history is
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Points per line when the caller doesn't know the chart's width in pixels
+DEFAULT_WIDTH = 1000
+
+
+def as_numeric(values):
+    """Chart x/y values as float64; dates and timestamps become their offset
+    from the epoch."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        values = values.astype('datetime64[us]')
+    if values.dtype.kind == 'M':
+        values = values.view('int64')
+    return values.astype('float64')
+
+
+def lttb_indices(x, y, width=DEFAULT_WIDTH):
+    """Indices of the width points LTTB keeps from a series sorted by x (all
+    of them if there are no more than width). The first and last points are
+    always kept; every bucket in between contributes the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average."""
+    n = len(x)
+    if width >= n or width < 3:
+        return np.arange(n)
+    x = as_numeric(x)
+    y = np.nan_to_num(as_numeric(y))
+
+    # width - 2 buckets over the points between the first and the last
+    edges = 1 + np.arange(width - 1, dtype=np.int64) * (n - 2) // (width - 2)
+    indices = np.empty(width, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(width - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[kept] - next_x) * (y[start:end] - y[kept])
+                       - (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(areas.argmax())
+        indices[bucket + 1] = kept
+    return indices
+
+
+def downsample_arrow(table, x, y, width=DEFAULT_WIDTH):
+    """LTTB over columns x and y of an Arrow table sorted by x; returns the
+    kept rows as a table."""
+    if table.num_rows <= width:
+        return table
+    xs = table[x].to_numpy(zero_copy_only=False)
+    ys = pc.cast(table[y], pa.float64()).to_numpy(zero_copy_only=False)
+    return table.take(lttb_indices(xs, ys, width))
+
+
+def downsample_df(df, x, y, width=DEFAULT_WIDTH):
+    """LTTB over columns x and y of a DataFrame sorted by x; returns the kept
+    rows."""
+    if len(df) <= width:
+        return df
+    return df.iloc[lttb_indices(df[x].to_numpy(), df[y].astype('float64').to_numpy(), width)]
@@ -3,12 +3,20 @@ eCommerce dbt Pipeline in Python
 Loads raw CSVs → Creates staging → Creates marts → Runs tests → Generates docs
 """
 
+import argparse
 import duckdb
+import hashlib
 import os
 import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
 from pathlib import Path
 from datetime import datetime
 
+from metadat import MODELS_DETAILED, RAW_SCHEMAS
+
 # ============================================================================
 # CONFIG
 # ============================================================================
@@ -17,6 +25,67 @@ RAW_DATA_DIR = PROJECT_DIR / "raw_data"
 DB_PATH = PROJECT_DIR / "ecommerce.duckdb"
 MODELS_DIR = PROJECT_DIR / "models"
 
+parser = argparse.ArgumentParser(description="Run the eCommerce dbt pipeline")
+parser.add_argument('--full-refresh', action='store_true',
+                    help="Reload every raw file, ignoring the load manifest")
+parser.add_argument('--raw-glob', action='append', default=[], metavar='TABLE=PATTERN',
+                    help="Glob (relative to raw_data/) of files for a raw table, e.g. "
+                         "events=events/*.parquet; repeatable")
+parser.add_argument('--threads', type=int, default=0,
+                    help="Raw tables loaded and models built concurrently "
+                         "(default: all raw tables, one model per CPU)")
+parser.add_argument('--select', nargs='+', metavar='MODEL',
+                    help="Only build these models; MODEL+ adds everything downstream, "
+                         "+MODEL everything upstream")
+parser.add_argument('--skip-view-counts', action='store_true',
+                    help="Don't execute views just to count their rows")
+parser.add_argument('--test-sample', type=float, metavar='PERCENT',
+                    help="Check relationships on a random sample of each child model's rows")
+parser.add_argument('--materialize', action='append', default=[], metavar='MODEL=STRATEGY',
+                    help="Override a model's materialization (view, table, incremental); repeatable")
+args = parser.parse_args()
+
+# Raw tables and model configuration are static, so --raw-glob, --materialize
+# and --select are checked here, before anything touches the database.
+raw_globs = {}
+for spec in args.raw_glob:
+    name, _, pattern = spec.partition('=')
+    if f"raw_{name}" not in RAW_SCHEMAS:
+        parser.error(f"unknown table {name!r} in --raw-glob, expected one of "
+                     f"{tuple(table[len('raw_'):] for table in RAW_SCHEMAS)}")
+    if not pattern:
+        parser.error(f"--raw-glob {spec!r} has no pattern, expected TABLE=PATTERN")
+    raw_globs.setdefault(name, []).append(pattern)
+
+MATERIALIZATIONS = ('view', 'table', 'incremental')
+
+model_config = {
+    'stg_users': {'materialized': 'view'},
+    'stg_products': {'materialized': 'view'},
+    'stg_orders': {'materialized': 'view'},
+    'stg_order_items': {'materialized': 'view'},
+    'stg_events': {'materialized': 'view'},
+    'dim_users': {'materialized': 'table'},
+    'dim_products': {'materialized': 'table'},
+    'fct_orders': {'materialized': 'incremental', 'unique_key': 'order_item_id'},
+    'fct_events': {'materialized': 'incremental', 'unique_key': 'event_id'},
+    'agg_daily_sales': {'materialized': 'incremental', 'unique_key': 'order_day'},
+}
+
+for spec in args.materialize:
+    model_name, _, materialized = spec.partition('=')
+    if model_name not in model_config:
+        parser.error(f"unknown model {model_name!r} in --materialize")
+    if materialized not in MATERIALIZATIONS:
+        parser.error(f"unknown materialization {materialized!r} for {model_name}, expected one of {MATERIALIZATIONS}")
+    if materialized == 'incremental' and 'unique_key' not in model_config[model_name]:
+        parser.error(f"{model_name} has no unique_key and cannot be incremental")
+    model_config[model_name]['materialized'] = materialized
+
+for selector in args.select or []:
+    if selector.strip('+') not in model_config:
+        parser.error(f"unknown model {selector.strip('+')!r} in --select")
+
 # Create directories
 MODELS_DIR.mkdir(exist_ok=True)
 (MODELS_DIR / "staging").mkdir(exist_ok=True)
@@ -47,31 +116,340 @@ raw_tables = {
     'events': 'raw_events'
 }
 
-for csv_name, table_name in raw_tables.items():
-    csv_path = RAW_DATA_DIR / f"{csv_name}.csv"
-    if csv_path.exists():
-        conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM read_csv_auto('{csv_path}')")
-        row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-        print(f"  ✓ {table_name}: {row_count} rows")
+# Typed Parquet (generate_csvs.py --format parquet) is a columnar scan with no
+# parsing. CSVs are read with the declared RAW_SCHEMAS types (ISO timestamps)
+# and no sniffing; rows that fail to parse are collected instead of aborting.
+readers = {
+    '.parquet': 'read_parquet',
+    '.csv': 'read_csv',
+}
+
+
+def reader_sql(table_name, ext):
+    schema = RAW_SCHEMAS[table_name]
+    if ext == '.csv':
+        columns = ', '.join(f"'{column}': '{dtype}'" for column, dtype in schema.items())
+        return (f"SELECT * FROM read_csv(?, columns={{{columns}}}, header=true, auto_detect=false, "
+                f"store_rejects=true, rejects_table='_rejects', rejects_scan='_rejects_scan')")
+    # Parquet carries its own types; casting pins older or foreign files to
+    # the same schema (a no-op for files from generate_csvs.py).
+    columns = ', '.join(f"CAST({column} AS {dtype}) AS {column}" for column, dtype in schema.items())
+    return f"SELECT {columns} FROM read_parquet(?)"
+
+
+def discover_raw_files(name):
+    """Files matching the table's glob patterns: by default raw_data/<name>.csv|parquet
+    plus any part/batch files under raw_data/<name>/. When a file exists in both
+    formats, the newer one wins."""
+    patterns = raw_globs.get(name, [f"{name}.*", f"{name}/**/*"])
+    candidates = [path for pattern in patterns for path in RAW_DATA_DIR.glob(pattern)
+                  if path.is_file() and path.suffix in readers]
+    newest = {}
+    for path in candidates:
+        stem = path.with_suffix('')
+        if stem not in newest or path.stat().st_mtime > newest[stem].stat().st_mtime:
+            newest[stem] = path
+    return sorted(newest.values())
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_files(cursor, table_name, paths, replace):
+    """Load files into table_name, replacing it or appending to it. Files are
+    scanned in one statement per format. Returns the number of rows loaded."""
+    rows = 0
+    for ext in readers:
+        group = [str(path) for path in paths if path.suffix == ext]
+        if not group:
+            continue
+        if replace:
+            sql = f"CREATE OR REPLACE TABLE {table_name} AS {reader_sql(table_name, ext)}"
+            replace = False
+        else:
+            sql = f"INSERT INTO {table_name} {reader_sql(table_name, ext)}"
+        rows += cursor.execute(sql, [group]).fetchone()[0]
+    return rows
+
+
+def schema_matches(cursor, table_name):
+    """True if the existing table already has the declared column types; tables
+    left by an older sniffing load are reloaded once under the pinned schema."""
+    columns = cursor.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+        [table_name]).fetchall()
+    return dict(columns) == RAW_SCHEMAS[table_name] and [c for c, _ in columns] == list(RAW_SCHEMAS[table_name])
+
+
+def load_raw_table(cursor, name, table_name, exists, previous_rows=None):
+    """Bring one raw table up to date with its files on its own cursor. Manifest
+    changes are returned rather than written, so only the main thread touches
+    _load_manifest."""
+    start = time.perf_counter()
+    files = discover_raw_files(name)
+    if not files:
+        return {'table': table_name, 'status': 'missing'}
+
+    manifest = {
+        path: (size, mtime, content_hash)
+        for path, size, mtime, content_hash in cursor.execute(
+            "SELECT file_path, file_size, file_mtime, content_hash FROM _load_manifest WHERE table_name = ?",
+            [table_name]).fetchall()
+    }
+    fingerprints = {}
+    new_files, changed_files = [], []
+    for path in files:
+        stat = path.stat()
+        known = manifest.get(str(path))
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime):
+            fingerprints[path] = known
+            continue
+        # Only hash files whose size or mtime moved; a touched but identical
+        # file is recorded again without being reloaded.
+        fingerprint = (stat.st_size, stat.st_mtime, file_hash(path))
+        fingerprints[path] = fingerprint
+        if known is None:
+            new_files.append(path)
+        elif known[2] != fingerprint[2]:
+            changed_files.append(path)
+    removed_files = set(manifest) - {str(path) for path in files}
+
+    if (args.full_refresh or not exists or not schema_matches(cursor, table_name)
+            or changed_files or removed_files):
+        status, loaded = 'reloaded', files
+        rows = load_files(cursor, table_name, files, replace=True)
+    elif new_files:
+        status, loaded = 'appended', new_files
+        rows = load_files(cursor, table_name, new_files, replace=False)
     else:
-        print(f"  ✗ {csv_path} not found!")
+        status, loaded, rows = 'unchanged', [], 0
+
+    # Reject tables are temporary, i.e. local to this cursor's connection
+    rejects = []
+    if any(path.suffix == '.csv' for path in loaded):
+        rejects = cursor.execute("""
+            SELECT s.file_path, e.line, e.column_name, CAST(e.error_type AS VARCHAR), e.csv_line, e.error_message
+            FROM _rejects e
+            JOIN _rejects_scan s USING (scan_id, file_id)
+            ORDER BY s.file_path, e.line
+        """).fetchall()
+
+    return {
+        'table': table_name,
+        'status': status,
+        'files': files,
+        'loaded': loaded,
+        'rows': rows,
+        'rejects': rejects,
+        'bytes': sum(fingerprints[path][0] for path in loaded),
+        'total_rows': (rows if status == 'reloaded' else previous_rows + rows if previous_rows is not None
+                       else cursor.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]),
+        'seconds': time.perf_counter() - start,
+        'manifest_updates': [
+            (str(path), *fingerprint) for path, fingerprint in fingerprints.items()
+            if path in loaded or manifest.get(str(path)) != fingerprint
+        ],
+    }
+
+
+# The load manifest records what is already in each raw table, so unchanged
+# files are skipped and new batch files are appended instead of reloading.
+conn.execute("""
+    CREATE TABLE IF NOT EXISTS _load_manifest (
+        table_name VARCHAR,
+        file_path VARCHAR,
+        file_size BIGINT,
+        file_mtime DOUBLE,
+        content_hash VARCHAR,
+        loaded_at TIMESTAMP,
+        PRIMARY KEY (table_name, file_path)
+    )
+""")
+
+conn.execute("""
+    CREATE TABLE IF NOT EXISTS _load_rejects (
+        table_name VARCHAR,
+        file_path VARCHAR,
+        line BIGINT,
+        column_name VARCHAR,
+        error_type VARCHAR,
+        csv_line VARCHAR,
+        error_message VARCHAR,
+        rejected_at TIMESTAMP
+    )
+""")
+
+# Row counts are taken from the statement that built each relation and cached
+# here, so nothing is re-executed just to be counted and later runs can reuse
+# counts of relations they did not touch.
+#
+# data_version fingerprints a relation's contents: raw tables hash their load
+# manifest, models hash their SQL and materialization together with their
+# parents' versions. It only changes when the underlying data or definition
+# does, and keys the shared query result cache (query_cache.py).
+conn.execute("""
+    CREATE TABLE IF NOT EXISTS _model_state (
+        relation_name VARCHAR PRIMARY KEY,
+        materialized VARCHAR,
+        row_count BIGINT,
+        built_at TIMESTAMP,
+        data_version VARCHAR
+    )
+""")
+cached_row_counts = dict(conn.execute("SELECT relation_name, row_count FROM _model_state").fetchall())
+data_versions = dict(conn.execute("SELECT relation_name, data_version FROM _model_state").fetchall())
+row_counts = {}
+
+
+def version_hash(*parts):
+    return hashlib.blake2b('\x1f'.join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def record_model_state(name, materialized, row_count, data_version):
+    row_counts[name] = row_count
+    data_versions[name] = data_version
+    conn.execute("""
+        INSERT OR REPLACE INTO _model_state (relation_name, materialized, row_count, built_at, data_version)
+        VALUES (?, ?, ?, ?, ?)
+    """, [name, materialized, row_count, datetime.now(), data_version])
+
+
+existing_tables = {row[0] for row in conn.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+raw_load_status = {}
+
+# Tables are independent, so each one is loaded on its own cursor and total
+# ingest time is bounded by the largest table rather than the sum.
+load_start = time.perf_counter()
+with ThreadPoolExecutor(max_workers=args.threads or len(raw_tables)) as pool:
+    futures = [
+        pool.submit(load_raw_table, conn.cursor(), name, table_name, table_name in existing_tables,
+                    cached_row_counts.get(table_name))
+        for name, table_name in raw_tables.items()
+    ]
+    results = [future.result() for future in futures]
+
+for name, result in zip(raw_tables, results):
+    table_name = result['table']
+    if result['status'] == 'missing':
+        print(f"  ✗ no files for {table_name} in {RAW_DATA_DIR} (looked for {name}.* and {name}/)")
+        continue
+
+    if result['status'] == 'reloaded':
+        conn.execute("DELETE FROM _load_manifest WHERE table_name = ?", [table_name])
+        conn.execute("DELETE FROM _load_rejects WHERE table_name = ?", [table_name])
+    if result['rejects']:
+        conn.executemany("INSERT INTO _load_rejects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         [[table_name, *reject, datetime.now()] for reject in result['rejects']])
+    for file_path, size, mtime, content_hash in result['manifest_updates']:
+        conn.execute("INSERT OR REPLACE INTO _load_manifest VALUES (?, ?, ?, ?, ?, ?)",
+                     [table_name, file_path, size, mtime, content_hash, datetime.now()])
+    raw_load_status[table_name] = result['status']
+    manifest_files = conn.execute(
+        "SELECT file_path, content_hash FROM _load_manifest WHERE table_name = ? ORDER BY file_path",
+        [table_name]).fetchall()
+    record_model_state(table_name, 'raw', result['total_rows'], version_hash(*manifest_files))
+
+    if result['status'] == 'unchanged':
+        print(f"  ✓ {table_name}: {result['total_rows']} rows (unchanged, {len(result['files'])} files skipped)")
+    else:
+        seconds = max(result['seconds'], 1e-9)
+        print(f"  ✓ {table_name}: {result['total_rows']} rows ({result['status']} {result['rows']} rows "
+              f"from {len(result['loaded'])} files in {result['seconds']:.2f}s, "
+              f"{result['bytes'] / 1e6 / seconds:.1f} MB/s, {result['rows'] / seconds:,.0f} rows/s)")
+
+    if result['rejects']:
+        print(f"    ⚠ {len(result['rejects'])} rows failed to parse, see _load_rejects")
+
+print(f"  Loaded raw data in {time.perf_counter() - load_start:.2f}s")
 
 # ============================================================================
-# STEP 2: CREATE STAGING MODELS
+# MATERIALIZATIONS
+# ============================================================================
+# dbt-style: staging stays as views over the raw tables, marts are stored as
+# tables so dashboard queries scan pre-joined, pre-typed columns instead of
+# re-running the joins and window functions on every read. Incremental models
+# run their incremental_sql (with {this} bound to the existing table) and
+# delete+insert the result by unique_key; the first run, --full-refresh, or a
+# reload of one of the model's upstream raw tables builds them like a table.
+
+
+def relation_type(cursor, name):
+    """'view', 'table' or None for an existing relation."""
+    if cursor.execute("SELECT 1 FROM duckdb_views() WHERE view_name = ? AND NOT internal", [name]).fetchone():
+        return 'view'
+    if cursor.execute("SELECT 1 FROM duckdb_tables() WHERE table_name = ?", [name]).fetchone():
+        return 'table'
+    return None
+
+
+def column_names(cursor, relation):
+    """Output columns of a table, view or SELECT, without running it."""
+    return [row[0] for row in cursor.execute(f"DESCRIBE {relation}").fetchall()]
+
+
+def build_model(cursor, model_name, sql, incremental_sql=None, raw_sources=(), previous_rows=None):
+    """Create or update a model according to its materialization. Returns a
+    short label of what was done and the model's row count, taken from the
+    rows the build statements affected (None for an uncounted view)."""
+    config = model_config.get(model_name, {})
+    materialized = config.get('materialized', 'view')
+    existing = relation_type(cursor, model_name)
+    if existing == 'view' and materialized != 'view':
+        cursor.execute(f"DROP VIEW {model_name}")
+        existing = None
+    elif existing == 'table' and materialized == 'view':
+        cursor.execute(f"DROP TABLE {model_name}")
+        existing = None
+
+    # Rows of a reloaded source may have changed anywhere, not just past the
+    # high-water mark, so the model is rebuilt rather than merged.
+    reloaded = [source for source in raw_sources if raw_load_status.get(source) == 'reloaded']
+
+    if materialized == 'view':
+        cursor.execute(f"CREATE OR REPLACE VIEW {model_name} AS {sql}")
+        # Counting a view executes it; that is opt-out per model or per run
+        if args.skip_view_counts or config.get('skip_count'):
+            return materialized, None
+        return materialized, cursor.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
+    if materialized == 'table':
+        return materialized, cursor.execute(f"CREATE OR REPLACE TABLE {model_name} AS {sql}").fetchone()[0]
+    # Rows can only be merged into a table that has the model's current columns
+    if (existing is None or args.full_refresh or reloaded
+            or column_names(cursor, model_name) != column_names(cursor, sql)):
+        row_count = cursor.execute(f"CREATE OR REPLACE TABLE {model_name} AS {sql}").fetchone()[0]
+        return f"{materialized}, full refresh", row_count
+
+    key = config['unique_key']
+    incremental_sql = (incremental_sql or sql).format(this=model_name)
+    merged = cursor.execute(f"CREATE OR REPLACE TEMP TABLE __incremental AS {incremental_sql}").fetchone()[0]
+    deleted = cursor.execute(f"DELETE FROM {model_name} WHERE {key} IN (SELECT {key} FROM __incremental)").fetchone()[0]
+    cursor.execute(f"INSERT INTO {model_name} SELECT * FROM __incremental")
+    cursor.execute("DROP TABLE __incremental")
+    if previous_rows is None:
+        row_count = cursor.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
+    else:
+        row_count = previous_rows - deleted + merged
+    return f"{materialized}, merged {merged} rows", row_count
+
+
+# ============================================================================
+# STAGING MODELS
 # ============================================================================
-print("\n" + "-"*80)
-print("STEP 2: CREATE STAGING MODELS")
-print("-"*80)
 
 staging_models = {
     'stg_users': """
         SELECT 
-            CAST(id AS INTEGER) AS user_id,
+            id AS user_id,
             email,
             first_name,
             last_name,
-            CAST(created_at AS TIMESTAMP) AS created_at,
-            CAST((CURRENT_TIMESTAMP - CAST(created_at AS TIMESTAMP)) AS INTEGER) AS account_age_days,
+            created_at,
+            CAST(DATE_DIFF('day', created_at, CAST(CURRENT_TIMESTAMP AS TIMESTAMP)) AS INTEGER) AS account_age_days,
             country,
             state
         FROM raw_users
@@ -79,59 +457,51 @@ staging_models = {
     
     'stg_products': """
         SELECT 
-            CAST(id AS INTEGER) AS product_id,
+            id AS product_id,
             name,
             category,
-            CAST(price AS DECIMAL(10,2)) AS price,
-            CAST(cost AS DECIMAL(10,2)) AS cost,
+            price,
+            cost,
             ROUND(CAST((price - cost) / price AS DECIMAL(10,3)), 3) AS margin,
-            CAST(created_at AS TIMESTAMP) AS created_at
+            created_at
         FROM raw_products
     """,
     
     'stg_orders': """
         SELECT 
-            CAST(id AS INTEGER) AS order_id,
-            CAST(user_id AS INTEGER) AS user_id,
-            CAST(order_date AS TIMESTAMP) AS order_date,
+            id AS order_id,
+            user_id,
+            order_date,
             status,
-            CAST(total_amount AS DECIMAL(10,2)) AS total_amount
+            total_amount
         FROM raw_orders
     """,
     
     'stg_order_items': """
         SELECT 
-            CAST(id AS INTEGER) AS order_item_id,
-            CAST(order_id AS INTEGER) AS order_id,
-            CAST(product_id AS INTEGER) AS product_id,
-            CAST(quantity AS INTEGER) AS quantity,
-            CAST(unit_price AS DECIMAL(10,2)) AS unit_price,
-            CAST(quantity * CAST(unit_price AS DECIMAL(10,2)) AS DECIMAL(10,2)) AS line_total
+            id AS order_item_id,
+            order_id,
+            product_id,
+            quantity,
+            unit_price,
+            CAST(quantity * unit_price AS DECIMAL(10,2)) AS line_total
         FROM raw_order_items
     """,
     
     'stg_events': """
         SELECT 
-            CAST(id AS INTEGER) AS event_id,
-            CAST(user_id AS INTEGER) AS user_id,
+            id AS event_id,
+            user_id,
             event_type,
-            CAST(event_date AS TIMESTAMP) AS event_date,
+            event_date,
             page
         FROM raw_events
     """
 }
 
-for model_name, sql in staging_models.items():
-    conn.execute(f"CREATE OR REPLACE VIEW {model_name} AS {sql}")
-    row_count = conn.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
-    print(f"  ✓ {model_name}: {row_count} rows")
-
 # ============================================================================
-# STEP 3: CREATE DIMENSION MODELS
+# DIMENSION MODELS
 # ============================================================================
-print("\n" + "-"*80)
-print("STEP 3: CREATE DIMENSION MODELS")
-print("-"*80)
 
 dim_models = {
     'dim_users': """
@@ -160,17 +530,9 @@ dim_models = {
     """
 }
 
-for model_name, sql in dim_models.items():
-    conn.execute(f"CREATE OR REPLACE VIEW {model_name} AS {sql}")
-    row_count = conn.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
-    print(f"  ✓ {model_name}: {row_count} rows")
-
 # ============================================================================
-# STEP 4: CREATE FACT MODELS
+# FACT MODELS
 # ============================================================================
-print("\n" + "-"*80)
-print("STEP 4: CREATE FACT MODELS")
-print("-"*80)
 
 fact_models = {
     'fct_orders': """
@@ -203,10 +565,227 @@ fact_models = {
     """
 }
 
-for model_name, sql in fact_models.items():
-    conn.execute(f"CREATE OR REPLACE VIEW {model_name} AS {sql}")
-    row_count = conn.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
-    print(f"  ✓ {model_name}: {row_count} rows")
+# Only rows past the high-water mark of the existing fact table ({this}) are
+# computed; build_model upserts them by unique_key.
+incremental_models = {
+    'fct_orders': """
+        SELECT 
+            oi.order_item_id,
+            o.order_id,
+            o.user_id,
+            oi.product_id,
+            oi.quantity,
+            oi.unit_price,
+            oi.line_total,
+            o.total_amount AS order_total,
+            o.status AS order_status,
+            o.order_date,
+            ROUND(CAST((p.price - p.cost) * oi.quantity AS DECIMAL(10,2)), 2) AS margin_dollars
+        FROM stg_order_items oi
+        JOIN stg_orders o ON oi.order_id = o.order_id
+        JOIN stg_products p ON oi.product_id = p.product_id
+        WHERE oi.order_item_id > (SELECT COALESCE(MAX(order_item_id), 0) FROM {this})
+           OR o.order_id > (SELECT COALESCE(MAX(order_id), 0) FROM {this})
+    """,
+
+    # New events continue each user's sequence from the last number already
+    # stored instead of re-running the window over the user's whole history.
+    'fct_events': """
+        WITH new_events AS (
+            SELECT * FROM stg_events
+            WHERE event_id > (SELECT COALESCE(MAX(event_id), 0) FROM {this})
+        ),
+        last_sequence AS (
+            SELECT user_id, MAX(event_sequence) AS last_sequence
+            FROM {this}
+            WHERE user_id IN (SELECT user_id FROM new_events)
+            GROUP BY user_id
+        )
+        SELECT 
+            e.event_id,
+            e.user_id,
+            e.event_type,
+            e.event_date,
+            e.page,
+            COALESCE(l.last_sequence, 0)
+                + ROW_NUMBER() OVER (PARTITION BY e.user_id ORDER BY e.event_date) AS event_sequence
+        FROM new_events e
+        LEFT JOIN last_sequence l ON e.user_id = l.user_id
+    """
+}
+
+# ============================================================================
+# AGGREGATE MODELS
+# ============================================================================
+# Daily sales rollup that the time-based dashboard queries read instead of
+# re-joining line items. GROUPING SETS store several grains per (day, status):
+# one row per product, per category, per price tier, and a day total, told
+# apart by the grain column. An order belongs to exactly one day, so summing
+# the daily distinct order counts over any date range stays exact.
+agg_daily_sales_sql = """
+    SELECT 
+        CAST(o.order_date AS DATE) AS order_day,
+        o.order_status,
+        CASE 
+            WHEN GROUPING(o.product_id) = 0 THEN 'product'
+            WHEN GROUPING(p.category) = 0 THEN 'category'
+            WHEN GROUPING(price_tier) = 0 THEN 'price_tier'
+            ELSE 'day'
+        END AS grain,
+        o.product_id,
+        p.category,
+        CASE 
+            WHEN p.price < 50 THEN 'Budget (<$50)'
+            WHEN p.price < 150 THEN 'Mid-Range ($50-150)'
+            WHEN p.price < 300 THEN 'Premium ($150-300)'
+            ELSE 'Luxury ($300+)'
+        END AS price_tier,
+        COUNT(DISTINCT o.order_id) AS orders,
+        COUNT(*) AS line_items,
+        SUM(o.quantity) AS units,
+        SUM(o.line_total) AS revenue,
+        SUM(o.margin_dollars) AS margin,
+        MAX(o.order_item_id) AS max_order_item_id
+    FROM fct_orders o
+    JOIN dim_products p ON o.product_id = p.product_id
+    {filter}
+    GROUP BY GROUPING SETS (
+        (order_day, o.order_status, o.product_id, p.category, price_tier),
+        (order_day, o.order_status, p.category),
+        (order_day, o.order_status, price_tier),
+        (order_day, o.order_status)
+    )
+"""
+
+agg_models = {
+    'agg_daily_sales': agg_daily_sales_sql.replace('{filter}', ''),
+}
+
+# Incremental runs recompute every day with fct_orders line items past the
+# highest order_item_id already rolled up, whether or not the day is the
+# latest one (late orders land on earlier days); build_model replaces those
+# days by order_day.
+incremental_models['agg_daily_sales'] = agg_daily_sales_sql.replace('{filter}', """
+    WHERE CAST(o.order_date AS DATE) IN (
+        SELECT DISTINCT CAST(order_date AS DATE) FROM fct_orders
+        WHERE order_item_id > (SELECT COALESCE(MAX(max_order_item_id), 0) FROM {this})
+    )""")
+
+# ============================================================================
+# STEP 2-4: BUILD MODELS
+# ============================================================================
+print("\n" + "-"*80)
+print("STEP 2-4: BUILD MODELS (staging → dimensions → facts → aggregates)")
+print("-"*80)
+
+all_models = {**staging_models, **dim_models, **fact_models, **agg_models}
+
+
+def model_dependencies(sql):
+    """Models and raw tables a model reads, taken from its FROM/JOIN clauses."""
+    names = set(re.findall(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)', sql, re.IGNORECASE))
+    return names & (set(all_models) | set(raw_tables.values()))
+
+
+dependencies = {
+    model_name: model_dependencies(sql) | set(model_config.get(model_name, {}).get('depends_on', []))
+    for model_name, sql in all_models.items()
+}
+parents = {model_name: deps & set(all_models) for model_name, deps in dependencies.items()}
+children = {model_name: {child for child, deps in parents.items() if model_name in deps} for model_name in all_models}
+
+
+def walk(model_name, edges):
+    """model_name plus everything reachable along edges."""
+    seen, stack = set(), [model_name]
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(edges[current])
+    return seen
+
+
+model_order = list(TopologicalSorter(parents).static_order())
+
+
+def model_version(model_name, versions):
+    """data_version of a model: its definition plus its parents' versions."""
+    materialized = model_config.get(model_name, {}).get('materialized', 'view')
+    return version_hash(materialized, all_models[model_name], incremental_models.get(model_name),
+                        *sorted((dep, versions.get(dep)) for dep in dependencies[model_name]))
+
+
+def upstream_raw_tables(model_name):
+    return {dep for upstream in walk(model_name, parents) for dep in dependencies[upstream]
+            if dep in raw_tables.values()}
+
+
+selected = set(all_models)
+if args.select:
+    selected = set()
+    for selector in args.select:
+        model_name = selector.strip('+')
+        selected.add(model_name)
+        if selector.endswith('+'):
+            selected |= walk(model_name, children)
+        if selector.startswith('+'):
+            selected |= walk(model_name, parents)
+
+
+def run_model(model_name):
+    """Build one model on its own cursor."""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    label, row_count = build_model(cursor, model_name, all_models[model_name],
+                                   incremental_models.get(model_name), upstream_raw_tables(model_name),
+                                   cached_row_counts.get(model_name))
+    cursor.close()
+    return label, row_count, time.perf_counter() - start
+
+
+# A model is submitted as soon as all of its selected parents are built, so
+# independent models (the five staging views, dim_* and fct_events) run
+# concurrently on separate cursors.
+build_start = time.perf_counter()
+model_results = {}
+pending = {model_name: parents[model_name] & selected for model_name in all_models if model_name in selected}
+with ThreadPoolExecutor(max_workers=args.threads or os.cpu_count()) as pool:
+    running = {}
+    while pending or running:
+        for model_name in [m for m, deps in pending.items() if not deps - model_results.keys()]:
+            running[pool.submit(run_model, model_name)] = model_name
+            del pending[model_name]
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            model_name = running.pop(future)
+            label, row_count, seconds = future.result()
+            model_results[model_name] = row_count
+            rows = 'not counted' if row_count is None else f"{row_count} rows"
+            print(f"  ✓ {model_name}: {rows} ({label}, {seconds:.2f}s)")
+
+# Versions are derived in dependency order, back to the raw tables' manifest
+# versions, whether or not a model was selected. A view reads its parents
+# live, so it follows their versions (and is recounted) even when it was not
+# rebuilt; a table that was not rebuilt keeps the version of the data it
+# actually holds.
+for model_name in model_order:
+    data_version = model_version(model_name, data_versions)
+    if model_name in model_results:
+        materialized = model_config.get(model_name, {}).get('materialized', 'view')
+        record_model_state(model_name, materialized, model_results[model_name], data_version)
+    elif relation_type(conn, model_name) == 'view' and data_version != data_versions.get(model_name):
+        row_count = None
+        if not (args.skip_view_counts or model_config.get(model_name, {}).get('skip_count')):
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]
+        record_model_state(model_name, 'view', row_count, data_version)
+        rows = 'not counted' if row_count is None else f"{row_count} rows"
+        print(f"  ✓ {model_name}: {rows} (view, not selected, inputs changed)")
+
+skipped = sorted(set(all_models) - selected)
+if skipped:
+    print(f"  - not selected: {', '.join(skipped)}")
+print(f"  Built {len(model_results)} models in {time.perf_counter() - build_start:.2f}s")
 
 # ============================================================================
 # STEP 5: RUN TESTS
@@ -215,27 +794,185 @@ print("\n" + "-"*80)
 print("STEP 5: RUN TESTS")
 print("-"*80)
 
-tests = [
-    ("dim_users: unique user_id", "SELECT COUNT(*) FROM dim_users WHERE user_id IS NULL"),
-    ("dim_users: not_null user_id", "SELECT COUNT(*) FROM dim_users WHERE user_id IS NULL"),
-    ("dim_products: unique product_id", "SELECT COUNT(DISTINCT product_id) = COUNT(*) FROM dim_products"),
-    ("dim_products: not_null product_id", "SELECT COUNT(*) FROM dim_products WHERE product_id IS NULL"),
-    ("fct_orders: not_null order_id", "SELECT COUNT(*) FROM fct_orders WHERE order_id IS NULL"),
-    ("fct_orders: not_null user_id", "SELECT COUNT(*) FROM fct_orders WHERE user_id IS NULL"),
-    ("fct_events: accepted_values event_type", "SELECT COUNT(*) FROM fct_events WHERE event_type NOT IN ('page_view', 'add_to_cart', 'purchase', 'search', 'product_view')"),
-]
+# Declarative tests per model: (test, column[, argument]) where the argument
+# is the accepted values list or the referenced "model.column". Each model's
+# column tests compile into one aggregate query, so a model is scanned once no
+# matter how many it has; relationships run separately as anti-joins, together
+# with the foreign keys declared in metadat.py.
+model_tests = {
+    'dim_users': [
+        ('unique', 'user_id'),
+        ('not_null', 'user_id'),
+    ],
+    'dim_products': [
+        ('unique', 'product_id'),
+        ('not_null', 'product_id'),
+    ],
+    'fct_orders': [
+        ('not_null', 'order_id'),
+        ('not_null', 'user_id'),
+    ],
+    'fct_events': [
+        ('accepted_values', 'event_type', ['page_view', 'add_to_cart', 'purchase', 'search', 'product_view']),
+    ],
+    'agg_daily_sales': [
+        ('not_null', 'order_day'),
+        ('accepted_values', 'grain', ['product', 'category', 'price_tier', 'day']),
+    ],
+}
+SAMPLE_SIZE = 5
+
+
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def compile_model_tests(model_name, model_test_list):
+    """One SELECT returning, per test, a failure count and up to SAMPLE_SIZE
+    failing keys (the model's unique column, or its incremental unique_key)."""
+    key = next((column for test, column, *_ in model_test_list if test == 'unique'),
+               model_config.get(model_name, {}).get('unique_key'))
+    expressions = []
+    for n, (test, column, *argument) in enumerate(model_test_list):
+        if test == 'not_null':
+            failing = f"m.{column} IS NULL"
+        elif test == 'accepted_values':
+            failing = f"m.{column} NOT IN ({', '.join(sql_literal(value) for value in argument[0])})"
+        elif test == 'unique':
+            # Duplicate rows beyond the first; duplicated values are sampled
+            # by a follow-up query only when the test fails
+            expressions.append(f"COUNT(m.{column}) - COUNT(DISTINCT m.{column}) AS failures_{n}")
+            expressions.append(f"NULL AS sample_{n}")
+            continue
+        else:
+            raise ValueError(f"unknown test type {test!r} on {model_name}.{column}")
+        sample = key or column
+        expressions.append(f"COUNT(*) FILTER (WHERE {failing}) AS failures_{n}")
+        if test == 'not_null' and sample == column:
+            # The failing values are all NULL, so there is nothing to show
+            expressions.append(f"NULL AS sample_{n}")
+        else:
+            expressions.append(f"MIN(m.{sample}, {SAMPLE_SIZE}) FILTER (WHERE {failing}) AS sample_{n}")
+    return f"SELECT {', '.join(expressions)} FROM {model_name} m"
+
+
+def run_relationship(child_model, column, parent):
+    """Anti-join one foreign key edge on its own cursor. Returns the number of
+    orphan rows and up to SAMPLE_SIZE orphan key values."""
+    parent_model, parent_column = parent.split('.')
+    child = child_model
+    if args.test_sample:
+        child = f"(SELECT {column} FROM {child_model} USING SAMPLE {args.test_sample} PERCENT (bernoulli))"
+    cursor = conn.cursor()
+    orphans, sample = cursor.execute(f"""
+        SELECT COALESCE(SUM(row_count), 0), MIN({column}, {SAMPLE_SIZE})
+        FROM (
+            SELECT c.{column}, COUNT(*) AS row_count
+            FROM {child} c
+            ANTI JOIN {parent_model} p ON c.{column} = p.{parent_column}
+            WHERE c.{column} IS NOT NULL
+            GROUP BY c.{column}
+        )
+    """).fetchone()
+    cursor.close()
+    return orphans, sample
+
 
 test_results = []
-for test_name, test_sql in tests:
+for model_name, model_test_list in model_tests.items():
+    model_test_list = [test for test in model_test_list if test[0] != 'relationships']
+    if not model_test_list:
+        continue
     try:
-        result = conn.execute(test_sql).fetchone()[0]
-        status = "PASS" if result == 0 or result == True else "FAIL"
-        test_results.append({"test": test_name, "status": status, "result": result})
-        symbol = "✓" if status == "PASS" else "✗"
-        print(f"  {symbol} {test_name}: {status}")
+        row = conn.execute(compile_model_tests(model_name, model_test_list)).fetchone()
     except Exception as e:
-        test_results.append({"test": test_name, "status": "ERROR", "error": str(e)})
-        print(f"  ✗ {test_name}: ERROR - {e}")
+        for test, column, *_ in model_test_list:
+            test_name = f"{model_name}: {test} {column}"
+            test_results.append({"test": test_name, "status": "ERROR", "error": str(e)})
+            print(f"  ✗ {test_name}: ERROR - {e}")
+        continue
+
+    for n, (test, column, *_) in enumerate(model_test_list):
+        test_name = f"{model_name}: {test} {column}"
+        failures, sample = row[2 * n], row[2 * n + 1]
+        if test == 'unique' and failures:
+            sample = [value for value, in conn.execute(
+                f"SELECT {column} FROM {model_name} WHERE {column} IS NOT NULL "
+                f"GROUP BY {column} HAVING COUNT(*) > 1 LIMIT {SAMPLE_SIZE}").fetchall()]
+        status = "PASS" if failures == 0 else "FAIL"
+        result = {"test": test_name, "status": status, "result": failures}
+        if failures:
+            result["sample"] = [str(value) for value in sample or []]
+        test_results.append(result)
+        if status == "PASS":
+            print(f"  ✓ {test_name}: PASS")
+        else:
+            examples = f", e.g. {', '.join(result['sample'])}" if result['sample'] else ""
+            print(f"  ✗ {test_name}: FAIL ({failures} rows{examples})")
+
+# Relationships: one anti-join per foreign key edge, edges run concurrently.
+# fct_orders inner-joins its parents, so orphans upstream (e.g. line items of
+# unknown orders) would otherwise silently drop out of revenue.
+relationship_edges = [
+    (model_name, column, parent)
+    for model_name, details in MODELS_DETAILED.items()
+    for column, parent in details.get('foreign_keys', {}).items()
+]
+relationship_edges += [
+    (model_name, column, argument[0])
+    for model_name, model_test_list in model_tests.items()
+    for test, column, *argument in model_test_list
+    if test == 'relationships' and (model_name, column, argument[0]) not in relationship_edges
+]
+
+sampled = f", {args.test_sample:g}% sample" if args.test_sample else ""
+with ThreadPoolExecutor(max_workers=args.threads or os.cpu_count()) as pool:
+    futures = [pool.submit(run_relationship, *edge) for edge in relationship_edges]
+    for (model_name, column, parent), future in zip(relationship_edges, futures):
+        test_name = f"{model_name}: relationships {column} -> {parent}"
+        try:
+            orphans, sample = future.result()
+        except Exception as e:
+            test_results.append({"test": test_name, "status": "ERROR", "error": str(e)})
+            print(f"  ✗ {test_name}: ERROR - {e}")
+            continue
+        status = "PASS" if orphans == 0 else "FAIL"
+        result = {"test": test_name, "status": status, "result": orphans}
+        if args.test_sample:
+            result["sample_percent"] = args.test_sample
+        if orphans:
+            result["sample"] = [str(value) for value in sample]
+        test_results.append(result)
+        if status == "PASS":
+            print(f"  ✓ {test_name}: PASS" + (f" ({args.test_sample:g}% sample)" if args.test_sample else ""))
+        else:
+            print(f"  ✗ {test_name}: FAIL ({orphans} orphan rows{sampled}, e.g. {', '.join(result['sample'])})")
+
+# _model_state must describe the database as it is now: every view and every
+# model built this run carries the version derived from its parents' recorded
+# versions and its actual row count, otherwise query_cache.py and the
+# dashboard's up-to-date check would serve results of older data.
+state = {name: (version, row_count) for name, version, row_count in conn.execute(
+    "SELECT relation_name, data_version, row_count FROM _model_state").fetchall()}
+recorded_versions = {name: version for name, (version, _) in state.items()}
+stale = []
+for model_name in model_order:
+    if model_name not in model_results and relation_type(conn, model_name) != 'view':
+        continue
+    version, row_count = state.get(model_name, (None, None))
+    if version != model_version(model_name, recorded_versions):
+        stale.append(f"{model_name} data_version")
+    elif row_count is not None and row_count != conn.execute(f"SELECT COUNT(*) FROM {model_name}").fetchone()[0]:
+        stale.append(f"{model_name} row_count")
+test_name = "_model_state: data_version and row_count current"
+result = {"test": test_name, "status": "FAIL" if stale else "PASS", "result": len(stale)}
+if stale:
+    result["sample"] = stale[:SAMPLE_SIZE]
+test_results.append(result)
+if stale:
+    print(f"  ✗ {test_name}: FAIL ({len(stale)} stale, e.g. {', '.join(result['sample'])})")
+else:
+    print(f"  ✓ {test_name}: PASS")
 
 # ============================================================================
 # STEP 6: GENERATE DOCUMENTATION
@@ -252,20 +989,17 @@ documentation = {
         "staging": list(staging_models.keys()),
         "marts": {
             "dimensions": list(dim_models.keys()),
-            "facts": list(fact_models.keys())
+            "facts": list(fact_models.keys()),
+            "aggregates": list(agg_models.keys())
         }
     },
+    "materializations": {name: config['materialized'] for name, config in model_config.items()},
     "tests": test_results,
+    # Counts captured while building; relations not rebuilt this run (see
+    # --select) keep their cached count from _model_state
     "row_counts": {
-        "raw_users": conn.execute("SELECT COUNT(*) FROM raw_users").fetchone()[0],
-        "raw_products": conn.execute("SELECT COUNT(*) FROM raw_products").fetchone()[0],
-        "raw_orders": conn.execute("SELECT COUNT(*) FROM raw_orders").fetchone()[0],
-        "raw_order_items": conn.execute("SELECT COUNT(*) FROM raw_order_items").fetchone()[0],
-        "raw_events": conn.execute("SELECT COUNT(*) FROM raw_events").fetchone()[0],
-        "dim_users": conn.execute("SELECT COUNT(*) FROM dim_users").fetchone()[0],
-        "dim_products": conn.execute("SELECT COUNT(*) FROM dim_products").fetchone()[0],
-        "fct_orders": conn.execute("SELECT COUNT(*) FROM fct_orders").fetchone()[0],
-        "fct_events": conn.execute("SELECT COUNT(*) FROM fct_events").fetchone()[0],
+        name: row_counts.get(name, cached_row_counts.get(name))
+        for name in [*raw_tables.values(), *dim_models, *fact_models, *agg_models]
     },
     "descriptions": {
         "stg_users": "Light cleaning of raw users. One row per user.",
@@ -277,6 +1011,7 @@ documentation = {
         "dim_products": "One row per product. Contains product attributes and margin.",
         "fct_orders": "One row per order line item. Contains order and product details with calculated margins.",
         "fct_events": "One row per event. Contains event details and event sequence within user.",
+        "agg_daily_sales": "Daily sales rollup per order status at product, category, price tier and day grain.",
     }
 }
 
@@ -332,6 +1067,7 @@ print(f"\nDatabase: {DB_PATH}")
 print(f"Staging models: {len(staging_models)}")
 print(f"Dimension models: {len(dim_models)}")
 print(f"Fact models: {len(fact_models)}")
+print(f"Aggregate models: {len(agg_models)}")
 print(f"Tests passed: {sum(1 for t in test_results if t['status'] == 'PASS')}/{len(test_results)}")
 print(f"Documentation: {docs_path}")
 print("\nReady for Hour 2!")
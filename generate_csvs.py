@@ -1,121 +1,912 @@
+import argparse
 import csv
+import glob
+import json
 import random
-from datetime import datetime, timedelta
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from itertools import islice
 import os
 
-# Create raw_data directory
-os.makedirs('raw_data', exist_ok=True)
-
-# Set seed for reproducibility
-random.seed(42)
-
-# Generate users.csv
-print("Generating users.csv...")
-users = []
-for user_id in range(1, 501):
-    users.append({
-        'id': user_id,
-        'email': f"user{user_id}@example.com",
-        'first_name': random.choice(['John', 'Jane', 'Bob', 'Alice', 'Charlie', 'Diana']),
-        'last_name': random.choice(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones']),
-        'created_at': (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
-        'country': random.choice(['US', 'UK', 'CA', 'DE', 'FR']),
-        'state': random.choice(['CA', 'NY', 'TX', 'FL', 'IL', 'PA', 'OH'])
-    })
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Scale factor 1 reproduces the original dataset: 500 users, 100 products,
+# ~2.5K orders, ~7.7K order items and ~13.5K events. Users (and therefore
+# orders, order items and events) grow linearly with the scale factor; the
+# product catalog stays fixed so it can be held in memory for unit_price lookups.
+USERS_PER_SCALE_FACTOR = 500
+NUM_PRODUCTS = 100
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_SHARD_SIZE = 100_000
+
+# Upper bounds of the per-user / per-order row counts drawn below.
+MAX_ORDERS_PER_USER = 10
+MAX_ITEMS_PER_ORDER = 5
+MIN_EVENTS_PER_USER = 5
+MAX_EVENTS_PER_USER = 50
 
-with open('raw_data/users.csv', 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=['id', 'email', 'first_name', 'last_name', 'created_at', 'country', 'state'])
-    writer.writeheader()
-    writer.writerows(users)
+# Column types used for Parquet output; CSV output writes the same columns as text.
+# Order, order item and event ids are 64-bit: the sharded engine hands every
+# shard an id block sized for its users' maximum rows, which passes 2**31 at a
+# few million users with the skewed profile.
+SCHEMAS = {
+    'users': pa.schema([
+        ('id', pa.int32()), ('email', pa.string()), ('first_name', pa.string()),
+        ('last_name', pa.string()), ('created_at', pa.timestamp('us')),
+        ('country', pa.string()), ('state', pa.string()),
+    ]),
+    'products': pa.schema([
+        ('id', pa.int32()), ('name', pa.string()), ('category', pa.string()),
+        ('price', pa.decimal128(10, 2)), ('cost', pa.decimal128(10, 2)),
+        ('created_at', pa.timestamp('us')),
+    ]),
+    'orders': pa.schema([
+        ('id', pa.int64()), ('user_id', pa.int32()), ('order_date', pa.timestamp('us')),
+        ('status', pa.string()), ('total_amount', pa.decimal128(10, 2)),
+    ]),
+    'order_items': pa.schema([
+        ('id', pa.int64()), ('order_id', pa.int64()), ('product_id', pa.int32()),
+        ('quantity', pa.int32()), ('unit_price', pa.decimal128(10, 2)),
+    ]),
+    'events': pa.schema([
+        ('id', pa.int64()), ('user_id', pa.int32()), ('event_type', pa.string()),
+        ('event_date', pa.timestamp('us')), ('page', pa.string()),
+    ]),
+}
+FIELDNAMES = {name: schema.names for name, schema in SCHEMAS.items()}
 
-# Generate products.csv
-print("Generating products.csv...")
+FILE_FORMATS = ('csv', 'parquet')
+# Matches DuckDB's own row group size, so each row group is one scan task.
+DEFAULT_ROW_GROUP_SIZE = 122_880
+
+first_names = ['John', 'Jane', 'Bob', 'Alice', 'Charlie', 'Diana']
+last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones']
+countries = ['US', 'UK', 'CA', 'DE', 'FR']
+states = ['CA', 'NY', 'TX', 'FL', 'IL', 'PA', 'OH']
 categories = ['Electronics', 'Clothing', 'Home & Garden', 'Sports', 'Books']
-products = []
-for product_id in range(1, 101):
-    products.append({
-        'id': product_id,
-        'name': f"Product {product_id}",
-        'category': random.choice(categories),
-        'price': round(random.uniform(10, 500), 2),
-        'cost': round(random.uniform(5, 250), 2),
-        'created_at': (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat()
+order_statuses = ['completed', 'pending', 'cancelled']
+event_types = ['page_view', 'add_to_cart', 'purchase', 'search', 'product_view']
+pages = ['/home', '/products', '/cart', '/checkout', '/account']
+
+# Average events per user (uniform 5..50); used to size numpy user chunks.
+AVG_EVENTS_PER_USER = 27.5
+
+# Daily volumes for --append-days, matching a full history spread over 366 days.
+ORDERS_PER_USER_PER_DAY = (MAX_ORDERS_PER_USER / 2) / 366
+EVENTS_PER_USER_PER_DAY = AVG_EVENTS_PER_USER / 366
+
+# Distribution profiles for the numpy engines. `uniform` reproduces the
+# original generator; `skewed` adds the hot keys and bursts seen in production:
+#   zipf_s      - product popularity ~ 1 / rank**s (hot products in fct_orders joins)
+#   user_alpha  - Pareto tail of per-user activity (heavy users in fct_events windows)
+#   seasonal    - weekly cycle, Q4 peak and retail holiday spikes in order/event dates
+#   max_orders_per_user / max_events_per_user - caps for the heavy tail; they also
+#   size the sharded engine's per-user id blocks
+DISTRIBUTION_PROFILES = {
+    'uniform': {'zipf_s': None, 'user_alpha': None, 'seasonal': False,
+                'max_orders_per_user': MAX_ORDERS_PER_USER, 'max_events_per_user': MAX_EVENTS_PER_USER},
+    'skewed': {'zipf_s': 1.1, 'user_alpha': 1.5, 'seasonal': True,
+               'max_orders_per_user': 100, 'max_events_per_user': 500},
+}
+
+# Seasonality: Monday..Sunday weights, annual peak around mid-December, and
+# (month, day) multipliers for the big retail days.
+WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 0.95, 1.1, 1.25, 1.2]
+SEASONAL_AMPLITUDE = 0.35
+PEAK_DAY_OF_YEAR = 350
+HOLIDAY_SPIKES = {(11, 28): 4.0, (12, 1): 3.0, (12, 20): 2.0, (7, 15): 2.5, (1, 2): 1.8}
+
+# Written next to the raw files after every run so --append-days can continue
+# the id sequences without rescanning them.
+STATE_FILE = '_generator_state.json'
+
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def open_csv(path, table):
+    """Open a CSV for bulk Arrow writes. The header is written by hand so it
+    matches the python engine (Arrow would quote the column names)."""
+    f = open(path, 'wb')
+    f.write((','.join(table.column_names) + '\n').encode())
+    return f, pa_csv.CSVWriter(f, table.schema, write_options=pa_csv.WriteOptions(
+        include_header=False, quoting_style='none'))
+
+
+def cast_table(table, schema):
+    """Cast generated columns to the typed schema. Dictionary columns (the
+    numpy engine's categoricals and timestamps) cast their small dictionary
+    once and expand it with take()."""
+    columns = []
+    for field in schema:
+        column = table[field.name]
+        if pa.types.is_dictionary(column.type):
+            column = pa.chunked_array(
+                [chunk.dictionary.cast(field.type).take(chunk.indices) for chunk in column.chunks],
+                field.type)
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class TableWriter:
+    """Streams Arrow tables for one raw table to CSV or Parquet.
+
+    Parquet output is cast to SCHEMAS (INTEGER/BIGINT ids, TIMESTAMP dates, DECIMAL
+    prices), zstd-compressed, and buffered so every row group except the last
+    holds exactly `row_group_size` rows.
+    """
+
+    def __init__(self, path, name, file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        self.path = path
+        self.name = name
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def write(self, table):
+        self.rows += table.num_rows
+        if self.file_format == 'csv':
+            if self._writer is None:
+                self._file, self._writer = open_csv(self.path, table)
+            self._writer.write_table(table)
+            return
+
+        self._pending.append(cast_table(table, SCHEMAS[self.name]))
+        self._pending_rows += table.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush(final=False)
+
+    def _flush(self, final):
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        full = table.num_rows if final else table.num_rows - table.num_rows % self.row_group_size
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, SCHEMAS[self.name], compression='zstd')
+        if full:
+            self._writer.write_table(table.slice(0, full), row_group_size=self.row_group_size)
+        rest = table.slice(full)
+        self._pending = [rest] if rest.num_rows else []
+        self._pending_rows = rest.num_rows
+
+    def close(self):
+        if self.file_format == 'parquet':
+            self._flush(final=True)
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================================
+# PYTHON ENGINE (row at a time, reference implementation)
+# ============================================================================
+
+
+def generate_users(num_users):
+    for user_id in range(1, num_users + 1):
+        yield (
+            user_id,
+            f"user{user_id}@example.com",
+            random.choice(first_names),
+            random.choice(last_names),
+            (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
+            random.choice(countries),
+            random.choice(states),
+        )
+
+
+def generate_products(num_products):
+    for product_id in range(1, num_products + 1):
+        yield (
+            product_id,
+            f"Product {product_id}",
+            random.choice(categories),
+            round(random.uniform(10, 500), 2),
+            round(random.uniform(5, 250), 2),
+            (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
+        )
+
+
+def generate_orders(num_users):
+    order_id = 1
+    for user_id in range(1, num_users + 1):
+        num_orders = random.randint(0, 10)
+        for _ in range(num_orders):
+            order_date = datetime.now() - timedelta(days=random.randint(0, 365))
+            yield (
+                order_id,
+                user_id,
+                order_date.isoformat(),
+                random.choice(order_statuses),
+                round(random.uniform(50, 1000), 2),
+            )
+            order_id += 1
+
+
+def generate_order_items(num_orders, products):
+    # Order ids are dense (1..num_orders), so line items can be generated
+    # without keeping the orders themselves in memory.
+    item_id = 1
+    for order_id in range(1, num_orders + 1):
+        num_items = random.randint(1, 5)
+        for _ in range(num_items):
+            product_id, price = random.choice(products)
+            yield (
+                item_id,
+                order_id,
+                product_id,
+                random.randint(1, 5),
+                price,
+            )
+            item_id += 1
+
+
+def generate_events(num_users):
+    event_id = 1
+    for user_id in range(1, num_users + 1):
+        num_events = random.randint(5, 50)
+        for _ in range(num_events):
+            yield (
+                event_id,
+                user_id,
+                random.choice(event_types),
+                (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
+                random.choice(pages),
+            )
+            event_id += 1
+
+
+def write_table(path, name, rows, chunk_size=DEFAULT_CHUNK_SIZE, on_row=None,
+                file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Stream rows to a CSV or Parquet file in fixed-size chunks. Returns the row count."""
+    fieldnames = FIELDNAMES[name]
+    row_count = 0
+    with open(path, 'w', newline='') if file_format == 'csv' else \
+            TableWriter(path, name, file_format, row_group_size) as f:
+        if file_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            if on_row is not None:
+                for row in chunk:
+                    on_row(row)
+            if file_format == 'csv':
+                writer.writerows(chunk)
+            else:
+                f.write(pa.Table.from_arrays([pa.array(column) for column in zip(*chunk)],
+                                             names=fieldnames))
+            row_count += len(chunk)
+    return row_count
+
+
+def generate_python(out, num_users, chunk_size=DEFAULT_CHUNK_SIZE, seed=42,
+                    file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    # Set seed for reproducibility
+    random.seed(seed)
+
+    def write(name, rows, **kwargs):
+        print(f"Generating {name}.{file_format}...")
+        return write_table(os.path.join(out, f"{name}.{file_format}"), name, rows, chunk_size,
+                           file_format=file_format, row_group_size=row_group_size, **kwargs)
+
+    counts = {}
+    counts['users'] = write('users', generate_users(num_users))
+
+    # The catalog is the only table kept in memory: order items need each
+    # product's price for unit_price.
+    products = []
+    counts['products'] = write('products', generate_products(NUM_PRODUCTS),
+                               on_row=lambda row: products.append((row[0], row[3])))
+
+    counts['orders'] = write('orders', generate_orders(num_users))
+    counts['order_items'] = write('order_items', generate_order_items(counts['orders'], products))
+    counts['events'] = write('events', generate_events(num_users))
+    return counts
+
+
+# ============================================================================
+# NUMPY ENGINE (column at a time, bulk writes)
+# ============================================================================
+
+def _choice(rng, values, n):
+    # Dictionary-encoded: codes are drawn in bulk and the strings are only
+    # materialized by the CSV writer.
+    return pa.DictionaryArray.from_arrays(rng.integers(0, len(values), n, dtype=np.int16), values)
+
+
+def _days_ago_strings(now):
+    # Every timestamp is `now - k days` for k in 0..365, so the ISO strings
+    # are formatted once and rows only draw an index into them.
+    return pa.array([(now - timedelta(days=days)).isoformat() for days in range(366)])
+
+
+def _days_ago(rng, day_strings, n):
+    return pa.DictionaryArray.from_arrays(rng.integers(0, len(day_strings), n, dtype=np.int16), day_strings)
+
+
+def _prices(rng, low, high, n):
+    return np.round(rng.uniform(low, high, n), 2)
+
+
+def _labels(prefix, ids, suffix=''):
+    return pc.binary_join_element_wise(prefix, pc.cast(pa.array(ids), pa.string()), suffix, '')
+
+
+def day_weight(day):
+    """Relative order/event volume of a calendar day under the seasonal profile."""
+    annual = 1 + SEASONAL_AMPLITUDE * np.cos(2 * np.pi * (day.timetuple().tm_yday - PEAK_DAY_OF_YEAR) / 365.25)
+    return WEEKDAY_WEIGHTS[day.weekday()] * annual * HOLIDAY_SPIKES.get((day.month, day.day), 1.0)
+
+
+def _cdf(weights):
+    cdf = np.cumsum(weights, dtype=np.float64)
+    return cdf / cdf[-1]
+
+
+def build_distributions(profile, now, seed=42):
+    """Precompute the samplers for a distribution profile. The result only
+    holds small arrays, so it is cheap to pass to shard processes."""
+    dist = dict(profile)
+    dist['product_cdf'] = None
+    dist['day_cdf'] = None
+    if profile['zipf_s'] is not None:
+        # Popularity ranks are shuffled once per seed so the hot products are
+        # spread over ids and categories rather than being products 1..k.
+        rank = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(4,))).permutation(NUM_PRODUCTS)
+        dist['product_cdf'] = _cdf(1.0 / (rank + 1) ** profile['zipf_s'])
+    if profile['seasonal']:
+        # Index k of the day dictionary is `now - k days`.
+        dist['day_cdf'] = _cdf([day_weight((now - timedelta(days=days)).date()) for days in range(366)])
+    if profile['user_alpha'] is not None and profile['user_alpha'] <= 1:
+        raise ValueError("user_alpha must be > 1 for the activity mean to exist")
+    return dist
+
+
+UNIFORM = build_distributions(DISTRIBUTION_PROFILES['uniform'], datetime.now())
+
+
+def _sample(rng, cdf, n):
+    return np.minimum(np.searchsorted(cdf, rng.random(n), side='right'), len(cdf) - 1)
+
+
+def _days_ago_weighted(rng, day_strings, n, dist):
+    if dist['day_cdf'] is None:
+        return _days_ago(rng, day_strings, n)
+    return pa.DictionaryArray.from_arrays(_sample(rng, dist['day_cdf'], n).astype(np.int16), day_strings)
+
+
+def _unit_hash(seed, ids):
+    """A uniform [0, 1) value per id: splitmix64 of the id, offset by the seed."""
+    with np.errstate(over='ignore'):
+        z = np.asarray(ids, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(seed)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def user_activity(user_ids, dist, seed=42):
+    """Per-user activity multipliers with mean 1 (Pareto tail), or None for
+    the uniform profile. A user's level depends only on (seed, user id), so
+    every engine, chunking and shard layout, and --append-days, agree on who
+    the heavy users are."""
+    alpha = dist['user_alpha']
+    if alpha is None:
+        return None
+    return (1 - _unit_hash(seed, user_ids)) ** (-1 / alpha) * (alpha - 1) / alpha
+
+
+def _per_user_counts(rng, n, activity, low, high, cap):
+    if activity is None:
+        return rng.integers(low, high + 1, n)
+    return np.clip(rng.poisson((low + high) / 2 * activity), low, cap)
+
+
+def numpy_users(rng, day_strings, user_ids):
+    n = len(user_ids)
+    return pa.table({
+        'id': user_ids,
+        'email': _labels('user', user_ids, '@example.com'),
+        'first_name': _choice(rng, first_names, n),
+        'last_name': _choice(rng, last_names, n),
+        'created_at': _days_ago(rng, day_strings, n),
+        'country': _choice(rng, countries, n),
+        'state': _choice(rng, states, n),
     })
 
-with open('raw_data/products.csv', 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=['id', 'name', 'category', 'price', 'cost', 'created_at'])
-    writer.writeheader()
-    writer.writerows(products)
-
-# Generate orders.csv
-print("Generating orders.csv...")
-orders = []
-order_id = 1
-for user_id in range(1, 501):
-    num_orders = random.randint(0, 10)
-    for _ in range(num_orders):
-        order_date = datetime.now() - timedelta(days=random.randint(0, 365))
-        orders.append({
-            'id': order_id,
-            'user_id': user_id,
-            'order_date': order_date.isoformat(),
-            'status': random.choice(['completed', 'pending', 'cancelled']),
-            'total_amount': round(random.uniform(50, 1000), 2)
-        })
-        order_id += 1
-
-with open('raw_data/orders.csv', 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=['id', 'user_id', 'order_date', 'status', 'total_amount'])
-    writer.writeheader()
-    writer.writerows(orders)
-
-# Generate order_items.csv
-print("Generating order_items.csv...")
-order_items = []
-item_id = 1
-for order in orders:
-    num_items = random.randint(1, 5)
-    for _ in range(num_items):
-        product = random.choice(products)
-        order_items.append({
-            'id': item_id,
-            'order_id': order['id'],
-            'product_id': product['id'],
-            'quantity': random.randint(1, 5),
-            'unit_price': product['price']
-        })
-        item_id += 1
-
-with open('raw_data/order_items.csv', 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=['id', 'order_id', 'product_id', 'quantity', 'unit_price'])
-    writer.writeheader()
-    writer.writerows(order_items)
-
-# Generate events.csv
-print("Generating events.csv...")
-event_types = ['page_view', 'add_to_cart', 'purchase', 'search', 'product_view']
-events = []
-event_id = 1
-for user_id in range(1, 501):
-    num_events = random.randint(5, 50)
-    for _ in range(num_events):
-        events.append({
-            'id': event_id,
-            'user_id': user_id,
-            'event_type': random.choice(event_types),
-            'event_date': (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
-            'page': random.choice(['/home', '/products', '/cart', '/checkout', '/account'])
-        })
-        event_id += 1
-
-with open('raw_data/events.csv', 'w', newline='') as f:
-    writer = csv.DictWriter(f, fieldnames=['id', 'user_id', 'event_type', 'event_date', 'page'])
-    writer.writeheader()
-    writer.writerows(events)
-
-print("\n✓ All CSVs generated successfully!")
-print(f"Users: {len(users)}")
-print(f"Products: {len(products)}")
-print(f"Orders: {len(orders)}")
-print(f"Order Items: {len(order_items)}")
-print(f"Events: {len(events)}")
\ No newline at end of file
+
+def numpy_products(rng, day_strings, num_products):
+    product_ids = np.arange(1, num_products + 1)
+    return pa.table({
+        'id': product_ids,
+        'name': _labels('Product ', product_ids),
+        'category': _choice(rng, categories, num_products),
+        'price': _prices(rng, 10, 500, num_products),
+        'cost': _prices(rng, 5, 250, num_products),
+        'created_at': _days_ago(rng, day_strings, num_products),
+    })
+
+
+def numpy_orders(rng, day_strings, user_ids, first_order_id, dist=UNIFORM, activity=None):
+    user_id = np.repeat(user_ids, _per_user_counts(rng, len(user_ids), activity, 0, MAX_ORDERS_PER_USER,
+                                                   dist['max_orders_per_user']))
+    n = len(user_id)
+    return pa.table({
+        'id': np.arange(first_order_id, first_order_id + n),
+        'user_id': user_id,
+        'order_date': _days_ago_weighted(rng, day_strings, n, dist),
+        'status': _choice(rng, order_statuses, n),
+        'total_amount': _prices(rng, 50, 1000, n),
+    })
+
+
+def numpy_order_items(rng, order_ids, product_ids, product_prices, first_item_id, dist=UNIFORM):
+    order_id = np.repeat(order_ids, rng.integers(1, MAX_ITEMS_PER_ORDER + 1, len(order_ids)))
+    n = len(order_id)
+    if dist['product_cdf'] is None:
+        product_idx = rng.integers(0, len(product_ids), n)
+    else:
+        product_idx = _sample(rng, dist['product_cdf'], n)
+    return pa.table({
+        'id': np.arange(first_item_id, first_item_id + n),
+        'order_id': order_id,
+        'product_id': product_ids[product_idx],
+        'quantity': rng.integers(1, 6, n),
+        'unit_price': product_prices[product_idx],
+    })
+
+
+def numpy_events(rng, day_strings, user_ids, first_event_id, dist=UNIFORM, activity=None):
+    user_id = np.repeat(user_ids, _per_user_counts(rng, len(user_ids), activity, MIN_EVENTS_PER_USER,
+                                                   MAX_EVENTS_PER_USER, dist['max_events_per_user']))
+    n = len(user_id)
+    return pa.table({
+        'id': np.arange(first_event_id, first_event_id + n),
+        'user_id': user_id,
+        'event_type': _choice(rng, event_types, n),
+        'event_date': _days_ago_weighted(rng, day_strings, n, dist),
+        'page': _choice(rng, pages, n),
+    })
+
+
+def _numpy_rngs(seed_sequence):
+    return dict(zip(('users', 'orders', 'order_items', 'events'),
+                    (np.random.default_rng(s) for s in seed_sequence.spawn(4))))
+
+
+def write_user_range(writers, rngs, day_strings, first_user, last_user, first_ids,
+                     product_ids, product_prices, chunk_size, dist=UNIFORM, seed=42):
+    """Generate users first_user..last_user with their orders, order items and
+    events, streaming each chunk to the matching TableWriter (closed on
+    return). Ids for each child table start at `first_ids[name]`. Returns the
+    row count per table."""
+    counts = dict.fromkeys(writers, 0)
+    # Events dominate the row count, so size user chunks from them.
+    users_per_chunk = max(1, int(chunk_size / AVG_EVENTS_PER_USER))
+
+    try:
+        for start in range(first_user, last_user + 1, users_per_chunk):
+            user_ids = np.arange(start, min(start + users_per_chunk, last_user + 1))
+
+            users = numpy_users(rngs['users'], day_strings, user_ids)
+            # One activity level per user drives both their orders and events.
+            activity = user_activity(user_ids, dist, seed)
+            orders = numpy_orders(rngs['orders'], day_strings, user_ids,
+                                  first_ids['orders'] + counts['orders'], dist, activity)
+            order_items = numpy_order_items(rngs['order_items'], orders['id'].to_numpy(),
+                                            product_ids, product_prices,
+                                            first_ids['order_items'] + counts['order_items'], dist)
+            events = numpy_events(rngs['events'], day_strings, user_ids,
+                                  first_ids['events'] + counts['events'], dist, activity)
+
+            for name, table in (('users', users), ('orders', orders),
+                                ('order_items', order_items), ('events', events)):
+                writers[name].write(table)
+                counts[name] += table.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
+
+
+def write_products(writer, rng, day_strings):
+    products = numpy_products(rng, day_strings, NUM_PRODUCTS)
+    with writer:
+        writer.write(products)
+    return products
+
+
+def generate_numpy(out, num_users, chunk_size=DEFAULT_CHUNK_SIZE, seed=42,
+                   file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                   profile=DISTRIBUTION_PROFILES['uniform']):
+    """Vectorized generator: same schemas and distributions as the python
+    engine, but each table gets its own seeded numpy Generator and is built
+    column by column in user-sized chunks."""
+    now = datetime.now()
+    day_strings = _days_ago_strings(now)
+    dist = build_distributions(profile, now, seed)
+    products_seed, tables_seed = np.random.SeedSequence(seed).spawn(2)
+
+    def writer(name):
+        return TableWriter(os.path.join(out, f"{name}.{file_format}"), name, file_format, row_group_size)
+
+    print(f"Generating products.{file_format}...")
+    products = write_products(writer('products'), np.random.default_rng(products_seed), day_strings)
+
+    print(f"Generating users, orders, order_items, events ({file_format})...")
+    writers = {name: writer(name) for name in ('users', 'orders', 'order_items', 'events')}
+    counts = write_user_range(writers, _numpy_rngs(tables_seed), day_strings, 1, num_users,
+                              dict.fromkeys(writers, 1), products['id'].to_numpy(),
+                              products['price'].to_numpy(), chunk_size, dist, seed)
+    counts['products'] = products.num_rows
+    return counts
+
+
+# ============================================================================
+# SHARDED NUMPY ENGINE (process pool, one part file per shard)
+# ============================================================================
+
+def shard_first_ids(first_user, profile=DISTRIBUTION_PROFILES['uniform']):
+    """Each shard owns a fixed id block per table, sized for the maximum rows
+    its users can produce, so shards never need to coordinate counters."""
+    users_before = first_user - 1
+    max_orders = profile['max_orders_per_user']
+    return {
+        'users': first_user,
+        'orders': users_before * max_orders + 1,
+        'order_items': users_before * max_orders * MAX_ITEMS_PER_ORDER + 1,
+        'events': users_before * profile['max_events_per_user'] + 1,
+    }
+
+
+def part_writer(out, name, part, file_format, row_group_size):
+    return TableWriter(os.path.join(out, name, f"{name}-{part:05d}.{file_format}"),
+                       name, file_format, row_group_size)
+
+
+def _generate_shard(out, shard, first_user, last_user, seed, now, dist,
+                    product_ids, product_prices, chunk_size, file_format, row_group_size):
+    # The seed is derived from (seed, shard) only, never from the worker that
+    # runs it, so output is identical for any --workers value.
+    shard_seed = np.random.SeedSequence(seed, spawn_key=(1, shard))
+    writers = {name: part_writer(out, name, shard, file_format, row_group_size)
+               for name in ('users', 'orders', 'order_items', 'events')}
+    return write_user_range(writers, _numpy_rngs(shard_seed), _days_ago_strings(now),
+                            first_user, last_user, shard_first_ids(first_user, dist),
+                            product_ids, product_prices, chunk_size, dist, seed)
+
+
+def generate_sharded(out, num_users, chunk_size=DEFAULT_CHUNK_SIZE, seed=42,
+                     file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                     profile=DISTRIBUTION_PROFILES['uniform'],
+                     workers=None, shard_size=DEFAULT_SHARD_SIZE):
+    """Partition users into fixed id ranges of `shard_size` and generate the
+    shards on a process pool. Every table is written as part files under
+    out/<table>/, e.g. raw_data/orders/orders-00003.csv."""
+    now = datetime.now()
+    dist = build_distributions(profile, now, seed)
+    for name in FIELDNAMES:
+        os.makedirs(os.path.join(out, name), exist_ok=True)
+
+    print(f"Generating products/products-00000.{file_format}...")
+    products_seed = np.random.SeedSequence(seed, spawn_key=(0,))
+    products = write_products(part_writer(out, 'products', 0, file_format, row_group_size),
+                              np.random.default_rng(products_seed), _days_ago_strings(now))
+    product_ids = products['id'].to_numpy()
+    product_prices = products['price'].to_numpy()
+
+    shards = [(shard, first_user, min(first_user + shard_size - 1, num_users))
+              for shard, first_user in enumerate(range(1, num_users + 1, shard_size))]
+    print(f"Generating {len(shards)} shards of up to {shard_size:,} users...")
+
+    counts = dict.fromkeys(FIELDNAMES, 0)
+    counts['products'] = products.num_rows
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_generate_shard, out, shard, first_user, last_user, seed, now, dist,
+                               product_ids, product_prices, chunk_size, file_format, row_group_size)
+                   for shard, first_user, last_user in shards]
+        for done, future in enumerate(as_completed(futures), start=1):
+            for name, rows in future.result().items():
+                counts[name] += rows
+            print(f"  ✓ {done}/{len(shards)} shards")
+    return counts
+
+
+# ============================================================================
+# APPEND MODE (daily batch files continuing the existing id sequences)
+# ============================================================================
+
+def table_files(out, name):
+    """Every file holding rows of `name`: out/<name>.<ext> plus part and
+    batch files under out/<name>/."""
+    files = []
+    for ext in FILE_FORMATS:
+        path = os.path.join(out, f"{name}.{ext}")
+        if os.path.exists(path):
+            files.append(path)
+        files.extend(sorted(glob.glob(os.path.join(out, name, f"*.{ext}"))))
+    return files
+
+
+def read_columns(path, columns):
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=columns)
+    return pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(include_columns=columns))
+
+
+def _column_max(out, name, column):
+    values = [pc.max(read_columns(path, [column])[column]).as_py() for path in table_files(out, name)]
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def save_state(out, num_users, next_ids, end_date, profile, seed=42):
+    with open(os.path.join(out, STATE_FILE), 'w') as f:
+        json.dump({
+            'num_users': num_users,
+            'next_ids': next_ids,
+            'end_date': end_date.isoformat(),
+            'profile': profile,
+            'seed': seed,
+        }, f, indent=2)
+
+
+def load_state(out):
+    """Read the generator state, or rebuild it by scanning the raw files when
+    the data predates the state file."""
+    path = os.path.join(out, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        state['end_date'] = date.fromisoformat(state['end_date'])
+        state.setdefault('profile', DISTRIBUTION_PROFILES['uniform'])
+        state.setdefault('seed', 42)
+        return state
+
+    print(f"No {STATE_FILE} found, scanning existing files for id sequences...")
+    num_users = _column_max(out, 'users', 'id')
+    if num_users is None:
+        raise SystemExit(f"No users found in {out}; generate a full dataset before appending")
+    last_order = _column_max(out, 'orders', 'order_date')
+    return {
+        'num_users': num_users,
+        'next_ids': {name: (_column_max(out, name, 'id') or 0) + 1
+                     for name in ('orders', 'order_items', 'events')},
+        'end_date': last_order.date() if last_order else date.today(),
+        'profile': DISTRIBUTION_PROFILES['uniform'],
+        'seed': 42,
+    }
+
+
+def _times_on(rng, day, n):
+    # Uniform over the day, formatted like datetime.isoformat().
+    start = np.datetime64(day, 'us')
+    offsets = rng.integers(0, 24 * 60 * 60 * 10**6, n).astype('timedelta64[us]')
+    return pa.array(np.datetime_as_string(np.sort(start + offsets), unit='us'))
+
+
+def _append_users(rng, num_users, user_cdf, n):
+    if user_cdf is None:
+        return rng.integers(1, num_users + 1, n)
+    return _sample(rng, user_cdf, n) + 1
+
+
+def append_day(rng, day, num_users, next_ids, product_ids, product_prices,
+               dist=UNIFORM, user_cdf=None):
+    volume = 1.0
+    if dist['seasonal']:
+        year = [day_weight(day - timedelta(days=days)) for days in range(366)]
+        volume = day_weight(day) / np.mean(year)
+
+    num_orders = rng.poisson(num_users * ORDERS_PER_USER_PER_DAY * volume)
+    order_ids = np.arange(next_ids['orders'], next_ids['orders'] + num_orders)
+    orders = pa.table({
+        'id': order_ids,
+        'user_id': _append_users(rng, num_users, user_cdf, num_orders),
+        'order_date': _times_on(rng, day, num_orders),
+        'status': _choice(rng, order_statuses, num_orders),
+        'total_amount': _prices(rng, 50, 1000, num_orders),
+    })
+    order_items = numpy_order_items(rng, order_ids, product_ids, product_prices,
+                                    next_ids['order_items'], dist)
+
+    num_events = rng.poisson(num_users * EVENTS_PER_USER_PER_DAY * volume)
+    events = pa.table({
+        'id': np.arange(next_ids['events'], next_ids['events'] + num_events),
+        'user_id': _append_users(rng, num_users, user_cdf, num_events),
+        'event_type': _choice(rng, event_types, num_events),
+        'event_date': _times_on(rng, day, num_events),
+        'page': _choice(rng, pages, num_events),
+    })
+    return {'orders': orders, 'order_items': order_items, 'events': events}
+
+
+def generate_append(out, days, start_date=None, seed=None,
+                    file_format='csv', row_group_size=DEFAULT_ROW_GROUP_SIZE, profile=None):
+    """Append `days` daily batches of orders, order items and events, e.g.
+    raw_data/orders/2026-10-17.csv. Users and products are left unchanged;
+    ids continue from the previous run, and the distribution profile and seed
+    of the previous run are kept unless `profile` or `seed` is given."""
+    state = load_state(out)
+    num_users = state['num_users']
+    next_ids = state['next_ids']
+    seed = state['seed'] if seed is None else seed
+    if start_date is None:
+        start_date = state['end_date'] + timedelta(days=1)
+    profile = profile or state['profile']
+    dist = build_distributions(profile, datetime.now(), seed)
+
+    # The same per-user activity as the full run, so heavy users in the
+    # history stay heavy in every batch.
+    activity = user_activity(np.arange(1, num_users + 1), dist, seed)
+    user_cdf = None if activity is None else _cdf(activity)
+
+    products = pa.concat_tables([read_columns(path, ['id', 'price']).cast(
+        pa.schema([('id', pa.int64()), ('price', pa.float64())]))
+        for path in table_files(out, 'products')])
+    product_ids = products['id'].to_numpy()
+    product_prices = products['price'].to_numpy()
+
+    counts = {'orders': 0, 'order_items': 0, 'events': 0}
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        # Seeded by the day, so re-running a window reproduces the same rows.
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(2, day.toordinal())))
+        tables = append_day(rng, day, num_users, next_ids, product_ids, product_prices, dist, user_cdf)
+        for name, table in tables.items():
+            os.makedirs(os.path.join(out, name), exist_ok=True)
+            with TableWriter(os.path.join(out, name, f"{day.isoformat()}.{file_format}"),
+                             name, file_format, row_group_size) as writer:
+                writer.write(table)
+            next_ids[name] += table.num_rows
+            counts[name] += table.num_rows
+        print(f"  ✓ {day}: {tables['orders'].num_rows} orders, "
+              f"{tables['order_items'].num_rows} order items, {tables['events'].num_rows} events")
+
+    save_state(out, num_users, next_ids, start_date + timedelta(days=days - 1), profile, seed)
+    return counts
+
+
+ENGINES = {
+    'python': generate_python,
+    'numpy': generate_numpy,
+    'sharded': generate_sharded,
+}
+
+
+def benchmark(scale_factor, chunk_size, file_format='csv'):
+    """Time every engine at the same scale factor and report rows per second."""
+    num_users = max(1, round(USERS_PER_SCALE_FACTOR * scale_factor))
+    results = {}
+    for engine, generate in ENGINES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            counts = generate(tmp, num_users, chunk_size, file_format=file_format)
+            elapsed = time.perf_counter() - start
+        rows = sum(counts.values())
+        results[engine] = rows / elapsed
+        print(f"  {engine:<8} {rows:>12,} rows in {elapsed:8.2f}s  ({rows / elapsed:>12,.0f} rows/s)")
+
+    baseline = results['python']
+    print("\nSpeedup vs python engine:")
+    for engine, rows_per_sec in results.items():
+        print(f"  {engine:<8} {rows_per_sec / baseline:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic eCommerce raw data (CSV or Parquet)")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="Dataset size multiplier; 1 = 500 users (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows buffered per write (default: %(default)s)")
+    parser.add_argument('--output-dir', default='raw_data',
+                        help="Directory for the generated files (default: raw_data)")
+    parser.add_argument('--format', dest='file_format', choices=FILE_FORMATS, default='csv',
+                        help="csv, or typed zstd-compressed parquet (default: csv)")
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help="Rows per Parquet row group (default: %(default)s)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='python',
+                        help="python = row-at-a-time reference, numpy = vectorized, "
+                             "sharded = numpy on a process pool with part files (default: python)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes for the sharded engine (default: CPU count)")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help="Users per shard for the sharded engine (default: %(default)s)")
+    parser.add_argument('--profile', choices=sorted(DISTRIBUTION_PROFILES), default=None,
+                        help="Distribution profile for the numpy engines: uniform, or skewed "
+                             "(Zipf products, power-law users, seasonal dates) (default: uniform)")
+    parser.add_argument('--zipf-s', type=float, default=None,
+                        help="Override the profile's Zipf exponent for product popularity")
+    parser.add_argument('--user-alpha', type=float, default=None,
+                        help="Override the profile's Pareto alpha for per-user activity (> 1)")
+    parser.add_argument('--seasonal', action=argparse.BooleanOptionalAction, default=None,
+                        help="Override the profile's weekly/annual/holiday date seasonality")
+    parser.add_argument('--append-days', type=int, default=None,
+                        help="Append N daily batch files of orders, order_items and events "
+                             "to an existing dataset instead of regenerating it")
+    parser.add_argument('--start-date', type=date.fromisoformat, default=None,
+                        help="First day for --append-days, YYYY-MM-DD (default: day after the last batch)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare rows/s of every engine at --scale-factor instead of generating")
+    args = parser.parse_args()
+
+    num_users = max(1, round(USERS_PER_SCALE_FACTOR * args.scale_factor))
+    if args.engine != 'sharded' and args.workers is not None:
+        parser.error("--workers requires --engine sharded")
+
+    profile = None
+    overrides = {'zipf_s': args.zipf_s, 'user_alpha': args.user_alpha, 'seasonal': args.seasonal}
+    if args.profile is not None or any(value is not None for value in overrides.values()):
+        profile = dict(DISTRIBUTION_PROFILES[args.profile or 'uniform'])
+        profile.update({key: value for key, value in overrides.items() if value is not None})
+    if profile is not None and profile != DISTRIBUTION_PROFILES['uniform'] \
+            and args.engine == 'python' and args.append_days is None:
+        parser.error("distribution profiles require --engine numpy or sharded")
+
+    if args.benchmark:
+        print(f"Benchmarking generators at scale factor {args.scale_factor:g}...")
+        benchmark(args.scale_factor, args.chunk_size, args.file_format)
+        return
+
+    if args.append_days is not None:
+        print(f"Appending {args.append_days} days to {args.output_dir}...")
+        counts = generate_append(args.output_dir, args.append_days, args.start_date,
+                                 file_format=args.file_format, row_group_size=args.row_group_size,
+                                 profile=profile)
+        print(f"\n✓ Appended {args.append_days} days")
+        print(f"Orders: {counts['orders']}")
+        print(f"Order Items: {counts['order_items']}")
+        print(f"Events: {counts['events']}")
+        return
+
+    # Create raw_data directory
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    profile = profile or DISTRIBUTION_PROFILES['uniform']
+    options = {'file_format': args.file_format, 'row_group_size': args.row_group_size}
+    if args.engine != 'python':
+        options['profile'] = profile
+    if args.engine == 'sharded':
+        options.update(workers=args.workers, shard_size=args.shard_size)
+    counts = ENGINES[args.engine](args.output_dir, num_users, args.chunk_size, **options)
+
+    if args.engine == 'sharded':
+        next_ids = shard_first_ids(num_users + 1, profile)
+    else:
+        next_ids = {name: counts[name] + 1 for name in ('orders', 'order_items', 'events')}
+    save_state(args.output_dir, num_users,
+               {name: next_ids[name] for name in ('orders', 'order_items', 'events')},
+               date.today(), profile)
+
+    print(f"\n✓ All {args.file_format.upper()} files generated successfully!")
+    print(f"Scale factor: {args.scale_factor:g} ({args.engine} engine)")
+    print(f"Users: {counts['users']}")
+    print(f"Products: {counts['products']}")
+    print(f"Orders: {counts['orders']}")
+    print(f"Order Items: {counts['order_items']}")
+    print(f"Events: {counts['events']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,645 +3,212 @@ HOUR 4: Generate Static HTML Dashboard
 No Streamlit, no Python version issues - just pure HTML + Plotly
 """
 
+import argparse
 import duckdb
-import pandas as pd
-from pathlib import Path
+import gzip
+import hashlib
+import importlib.util
 import json
-
-PROJECT_DIR = Path(__file__).parent
-DB_PATH = PROJECT_DIR / "ecommerce.duckdb"
-QUERIES_DIR = PROJECT_DIR / "queries"
-
-# Load queries
-def load_query(filename):
-    with open(QUERIES_DIR / filename, 'r') as f:
-        return f.read()
-
-# Connect and load data
-conn = duckdb.connect(str(DB_PATH))
-"""
-HOUR 4: Generate Static HTML Dashboard
-No Streamlit, no Python version issues - just pure HTML + Plotly
-"""
-
-import duckdb
-import pandas as pd
+import shutil
+import pyarrow as pa
 from pathlib import Path
-import json
+import os
+import time
+from datetime import date, timedelta
+
+from dashboard_render import CHART_SOURCES, PLOTLY_CDN, chart_json, render_html
+from downsample import DEFAULT_WIDTH
+from query_cache import MAX_CACHE_AGE_SECONDS, data_versions, referenced_relations, stats as cache_stats
+from query_registry import QUERIES, QueryRunner, filter_options
 
 PROJECT_DIR = Path(__file__).parent
 DB_PATH = PROJECT_DIR / "ecommerce.duckdb"
-QUERIES_DIR = PROJECT_DIR / "queries"
-
-# Load queries
-def load_query(filename):
-    with open(QUERIES_DIR / filename, 'r') as f:
-        return f.read()
+SPLIT_DIR = PROJECT_DIR / "dashboard"
+STATE_PATH = PROJECT_DIR / ".dashboard_state.json"
+
+parser = argparse.ArgumentParser(description="Generate the static HTML dashboard")
+parser.add_argument('--date-from', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                    help="Only include orders and events on or after this day")
+parser.add_argument('--date-to', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                    help="Only include orders and events on or before this day")
+parser.add_argument('--category', action='append', dest='categories', metavar='CATEGORY',
+                    help="Only include products in this category; repeatable")
+parser.add_argument('--status', default='completed',
+                    help="Order status to include, or 'all' (default: completed)")
+parser.add_argument('--threads', type=int, default=0,
+                    help="Queries run concurrently, each thread on its own DuckDB cursor "
+                         "(default: one per CPU; 1 runs them one after another)")
+parser.add_argument('--trend-days', type=int, default=30,
+                    help="Days shown in the daily revenue trend, ending at the last day "
+                         "(default: 30; 0 shows the whole date range)")
+parser.add_argument('--chart-width', type=int, default=DEFAULT_WIDTH, metavar='PIXELS',
+                    help="Time series are downsampled (LTTB) to at most one point per pixel "
+                         f"of this width (default: {DEFAULT_WIDTH})")
+parser.add_argument('--split', action='store_true',
+                    help="Write dashboard/index.html plus one gzipped JSON file per chart, "
+                         "fetched when the chart scrolls into view, and a local Plotly bundle")
+parser.add_argument('--force', action='store_true',
+                    help="Regenerate even if no model changed since the last run")
+args = parser.parse_args()
 
 # Connect and load data
 conn = duckdb.connect(str(DB_PATH))
-
-revenue_by_category_sql = load_query("revenue_by_category.sql")
-top_products_sql = load_query("top_products.sql")
-user_cohort_sql = load_query("user_cohort.sql")
-event_funnel_sql = load_query("event_funnel.sql")
-daily_revenue_sql = load_query("daily_revenue.sql")
-customer_lifetime_value_sql = load_query("customer_lifetime_value.sql")
-category_by_month_sql = load_query("category_by_month.sql")
-product_price_tiers_sql = load_query("product_price_tiers.sql")
-
-# Execute queries
-revenue_by_cat = conn.execute(revenue_by_category_sql).df()
-top_products = conn.execute(top_products_sql).df()
-user_cohort = conn.execute(user_cohort_sql).df()
-event_funnel = conn.execute(event_funnel_sql).df()
-daily_revenue = conn.execute(daily_revenue_sql).df()
-customer_lifetime_value = conn.execute(customer_lifetime_value_sql).df()
-category_by_month = conn.execute(category_by_month_sql).df()
-product_price_tiers = conn.execute(product_price_tiers_sql).df()
-
-print("✓ All data loaded")
-
-# Calculate metrics
-total_revenue = float(revenue_by_cat['revenue'].sum())
-total_orders = int(revenue_by_cat['order_count'].sum())
-avg_order_value = float(revenue_by_cat['avg_order_value'].mean())
-total_margin = float(revenue_by_cat['total_margin'].sum())
-
-top_category = revenue_by_cat.loc[revenue_by_cat['revenue'].idxmax()]
-top_product = top_products.iloc[0]
-newest_cohort = user_cohort.iloc[0]
-
-purchase_users = int(event_funnel[event_funnel['event_type'] == 'purchase']['user_count'].values[0])
-all_users = int(event_funnel['user_count'].max())
-conversion = (purchase_users / all_users) * 100
-
-# Prepare data for JSON
-chart1_data = {
-    'categories': revenue_by_cat['category'].tolist(),
-    'revenues': revenue_by_cat['revenue'].astype(float).tolist()
+output_path = SPLIT_DIR / "index.html" if args.split else PROJECT_DIR / "dashboard.html"
+
+# ============================================================================
+# SKIP UNCHANGED RUNS
+# ============================================================================
+# .dashboard_state.json records, per output, what the last run was built from:
+# the data_version of every model the queries read, the options, and a hash
+# of the dashboard code and query SQL, plus a hash of each query's result.
+# When none of the inputs changed the run stops here without running a query.
+# Relative-date queries (cohorts, days since last order) still refresh once
+# the output is older than the query cache's max age.
+def source_hash():
+    digest = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16)
+    digest.update((PROJECT_DIR / "dashboard_render.py").read_bytes())
+    for query in QUERIES.values():
+        digest.update(query['sql'].encode())
+    return digest.hexdigest()
+
+def dashboard_inputs():
+    """What the dashboard is built from, or None if a model it reads has no
+    recorded data_version (the database predates version tracking)."""
+    relations = sorted({relation for query in QUERIES.values() for relation in referenced_relations(conn, query['sql'])})
+    versions = data_versions(conn, relations)
+    if versions is None:
+        return None
+    options = {key: str(value) for key, value in sorted(vars(args).items()) if key not in ('threads', 'force')}
+    return {'versions': versions, 'options': options, 'source': source_hash()}
+
+states = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+state_key = output_path.relative_to(PROJECT_DIR).as_posix()
+previous = states.get(state_key, {})
+inputs = dashboard_inputs()
+if (not args.force and inputs is not None and previous.get('inputs') == inputs and output_path.exists()
+        and time.time() - previous.get('generated_at', 0) < MAX_CACHE_AGE_SECONDS):
+    print(f"✓ {output_path} is up to date (no model changed since the last run); use --force to rebuild")
+    conn.close()
+    raise SystemExit(0)
+
+# Filters are bound as query parameters, so DuckDB applies them in the scans
+filters = {
+    'date_from': args.date_from,
+    'date_to': args.date_to,
+    'categories': args.categories,
+    'status': None if args.status == 'all' else args.status,
 }
+options = filter_options(conn)
+first_day = args.date_from or options['date_min']
+latest_day = args.date_to or options['date_max']
+trend = filters
+if args.trend_days:
+    trend = {**filters, 'date_from': max(latest_day - timedelta(days=args.trend_days - 1), first_day)}
+latest_month = {**filters, 'date_from': max(latest_day.replace(day=1), args.date_from or date.min),
+                'date_to': latest_day}
+
+# Execute queries from the registry (served from the shared result cache until
+# the pipeline changes the models they read)
+jobs = {
+    'revenue_by_category': ('revenue_by_category', filters),
+    'top_products': ('top_products', filters),
+    'user_cohort': ('user_cohort', filters),
+    'event_funnel': ('event_funnel', filters),
+    'daily_revenue': ('daily_revenue', trend),
+    'customer_lifetime_value': ('customer_lifetime_value', filters),
+    'category_by_month': ('category_by_month', filters),
+    'latest_month': ('category_by_month', latest_month),
+    'product_price_tiers': ('product_price_tiers', filters),
+}
+runner = QueryRunner(conn)
+start = time.perf_counter()
+results = runner.run_batch(jobs, threads=args.threads or os.cpu_count(), arrow=True)
+elapsed = time.perf_counter() - start
+
+def result_hash(table):
+    sink = pa.BufferOutputStream()
+    table = table.combine_chunks()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return hashlib.blake2b(sink.getvalue().to_pybytes(), digest_size=16).hexdigest()
+
+result_hashes = {key: result_hash(table) for key, table in results.items()}
+changed = {key for key, digest in result_hashes.items() if previous.get('results', {}).get(key) != digest}
+
+for key, seconds in runner.latencies.items():
+    print(f"  {key:<25} {seconds * 1000:>8.1f} ms{'  (changed)' if key in changed else ''}")
+print(f"✓ All data loaded in {elapsed * 1000:.1f} ms "
+      f"(sum of queries {sum(runner.latencies.values()) * 1000:.1f} ms; "
+      f"cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+
+chart_data = chart_json(results, args.chart_width)
+
+# ============================================================================
+# OUTPUT MODE
+# ============================================================================
+# Inline: one self-contained dashboard.html with every chart's data embedded.
+# Split: a small shell that fetches data/<chart>.json.gz as each chart scrolls
+# into view, served over http.
+def vendor_plotly(output_dir):
+    """Copy the plotly.min.js shipped with the plotly package next to the
+    shell; falls back to the CDN if plotly is not installed."""
+    spec = importlib.util.find_spec('plotly')
+    bundle = spec and Path(spec.origin).parent / "package_data" / "plotly.min.js"
+    if not bundle or not bundle.exists():
+        print(f"⚠ plotly package not found, the dashboard loads Plotly from {PLOTLY_CDN}")
+        return PLOTLY_CDN
+    target = output_dir / "plotly.min.js"
+    if not target.exists() or target.stat().st_size != bundle.stat().st_size:
+        shutil.copyfile(bundle, target)
+    return "plotly.min.js"
+
+if args.split:
+    (SPLIT_DIR / "data").mkdir(parents=True, exist_ok=True)
+    plotly_src = vendor_plotly(SPLIT_DIR)
+    # Only charts whose query result changed are rewritten (the chart options
+    # are part of the recorded inputs, so any other change rebuilds them all)
+    rebuild_all = (previous.get('inputs') or {}).get('options') != (inputs or {}).get('options')
+    rewritten = 0
+    for chart_id, text in chart_data.items():
+        chart_path = SPLIT_DIR / "data" / f"{chart_id}.json.gz"
+        if rebuild_all or CHART_SOURCES[chart_id] in changed or not chart_path.exists():
+            # mtime=0 keeps the files byte-identical when the data is unchanged
+            chart_path.write_bytes(gzip.compress(text.encode(), mtime=0))
+            rewritten += 1
+else:
+    plotly_src = PLOTLY_CDN
+
+context = {
+    'first_day': first_day,
+    'latest_day': latest_day,
+    'categories': args.categories,
+    'status': args.status,
+    'trend_days': args.trend_days,
+}
+html = render_html(results, context, None if args.split else chart_data, plotly_src)
 
-chart2_cohorts = user_cohort['cohort'].tolist()
-chart2_users = user_cohort['user_count'].astype(int).tolist()
-chart2_orders = user_cohort['total_orders'].astype(int).tolist()
-
-chart3_events = event_funnel['event_type'].tolist()
-chart3_users_funnel = event_funnel['user_count'].astype(int).tolist()
-
-daily_sorted = daily_revenue.sort_values('order_date')
-chart4_dates = daily_sorted['order_date'].astype(str).tolist()
-chart4_revenues = daily_sorted['revenue'].astype(float).tolist()
-
-# Chart 5: Top CLV customers
-top_clv = customer_lifetime_value.nlargest(10, 'lifetime_revenue')
-clv_emails = [f"User {row['user_id']}" for _, row in top_clv.iterrows()]
-clv_revenues = top_clv['lifetime_revenue'].astype(float).tolist()
-
-# Chart 6: Category by month (latest month)
-category_by_month_sorted = category_by_month.sort_values('month', ascending=False)
-latest_month = category_by_month_sorted['month'].iloc[0]
-latest_month_data = category_by_month_sorted[category_by_month_sorted['month'] == latest_month]
-cat_month_cats = latest_month_data['category'].tolist()
-cat_month_revenue = latest_month_data['revenue'].astype(float).tolist()
-
-# Chart 7: Price tier performance
-price_tiers = product_price_tiers['price_tier'].tolist()
-price_tier_orders = product_price_tiers['orders'].astype(int).tolist()
-price_tier_revenue = product_price_tiers['revenue'].astype(float).tolist()
-# Chart 8: Category Revenue Trend Over Time
-category_by_month_sorted = category_by_month.sort_values('month')
-months = sorted(category_by_month_sorted['month'].unique())
-months_str = [str(m) for m in months]
-categories_unique = category_by_month_sorted['category'].unique()
-
-category_traces_data = {}
-for cat in categories_unique:
-    cat_data = category_by_month_sorted[category_by_month_sorted['category'] == cat].sort_values('month')
-    category_traces_data[cat] = cat_data['revenue'].astype(float).tolist()
-# Top products for table
-top_10_products = []
-for idx, row in top_products.head(10).iterrows():
-    top_10_products.append({
-        'name': row['name'],
-        'revenue': float(row['revenue']),
-        'margin': float(row['margin_pct']) * 100
-    })
-
-# Build HTML
-html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>eCommerce Analytics Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #333;
-            min-height: 100vh;
-            padding: 20px;
-        }}
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.12);
-            padding: 40px;
-        }}
-        .header {{
-            text-align: center;
-            margin-bottom: 40px;
-            border-bottom: 3px solid #667eea;
-            padding-bottom: 20px;
-        }}
-        .header h1 {{
-            font-size: 2.5em;
-            color: #333;
-            margin-bottom: 10px;
-        }}
-        .header p {{
-            color: #666;
-            font-size: 1.1em;
-        }}
-        .metrics {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin-bottom: 40px;
-        }}
-        .metric-card {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 25px;
-            border-radius: 10px;
-            box-shadow: 0 10px 25px rgba(102, 126, 234, 0.12);
-            text-align: center;
-        }}
-        .metric-card h3 {{
-            font-size: 0.9em;
-            opacity: 0.9;
-            margin-bottom: 10px;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-        .metric-card .value {{
-            font-size: 2em;
-            font-weight: bold;
-        }}
-        .charts-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(500px, 1fr));
-            gap: 30px;
-            margin-bottom: 40px;
-        }}
-        .chart-container {{
-            background: #f8f9fa;
-            border-radius: 10px;
-            padding: 20px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }}
-        .chart-title {{
-            font-size: 1.3em;
-            font-weight: bold;
-            margin-bottom: 15px;
-            color: #333;
-        }}
-        .insights {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 20px;
-            margin-bottom: 40px;
-        }}
-        .insight-card {{
-            padding: 25px;
-            border-radius: 10px;
-            border-left: 5px solid;
-        }}
-        .insight-success {{
-            background: #d4edda;
-            border-color: #28a745;
-            color: #155724;
-        }}
-        .insight-info {{
-            background: #d1ecf1;
-            border-color: #17a2b8;
-            color: #0c5460;
-        }}
-        .insight-warning {{
-            background: #fff3cd;
-            border-color: #ffc107;
-            color: #856404;
-        }}
-        .insight-card h4 {{
-            font-size: 1.1em;
-            margin-bottom: 10px;
-        }}
-        .insight-card p {{
-            font-size: 0.95em;
-            line-height: 1.6;
-        }}
-        .summary {{
-            background: #f0f4ff;
-            border: 2px solid #667eea;
-            padding: 30px;
-            border-radius: 10px;
-            margin-bottom: 30px;
-        }}
-        .summary h3 {{
-            color: #667eea;
-            margin-bottom: 15px;
-            font-size: 1.5em;
-        }}
-        .summary p {{
-            line-height: 1.8;
-            color: #555;
-            margin-bottom: 10px;
-        }}
-        .summary ul {{
-            margin-left: 20px;
-            color: #555;
-        }}
-        .summary li {{
-            margin-bottom: 8px;
-            line-height: 1.6;
-        }}
-        .footer {{
-            text-align: center;
-            color: #999;
-            font-size: 0.9em;
-            border-top: 1px solid #eee;
-            padding-top: 20px;
-            margin-top: 40px;
-        }}
-        .table-container {{
-            overflow-x: auto;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 10px 0;
-        }}
-        th {{
-            background: #667eea;
-            color: white;
-            padding: 12px;
-            text-align: left;
-            font-weight: 600;
-        }}
-        td {{
-            padding: 10px 12px;
-            border-bottom: 1px solid #eee;
-        }}
-        tr:hover {{
-            background: #f5f5f5;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📊 eCommerce Analytics Dashboard</h1>
-            <p>Real-time analytics powered by dbt + DuckDB</p>
-        </div>
-        
-        <div class="metrics">
-            <div class="metric-card">
-                <h3>Total Revenue</h3>
-                <div class="value">${total_revenue:,.0f}</div>
-            </div>
-            <div class="metric-card">
-                <h3>Total Orders</h3>
-                <div class="value">{total_orders:,.0f}</div>
-            </div>
-            <div class="metric-card">
-                <h3>Avg Order Value</h3>
-                <div class="value">${avg_order_value:,.2f}</div>
-            </div>
-            <div class="metric-card">
-                <h3>Total Margin</h3>
-                <div class="value">${total_margin:,.0f}</div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <div class="chart-title">📦 Revenue by Category</div>
-                <div id="chart1" style="width:100%;height:400px;"></div>
-            </div>
-            <div class="chart-container">
-                <div class="chart-title">⭐ Top 10 Products</div>
-                <div class="table-container">
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>Product</th>
-                                <th>Revenue</th>
-                                <th>Margin %</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-"""
-
-# Add top products to table
-for idx, row in top_products.head(10).iterrows():
-    html += f"""
-                            <tr>
-                                <td>{row['name']}</td>
-                                <td>${row['revenue']:,.0f}</td>
-                                <td>{row['margin_pct']*100:.1f}%</td>
-                            </tr>
-    """
-
-html += f"""
-                        </tbody>
-                    </table>
-                </div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <div class="chart-title">👥 User Cohorts by Account Age</div>
-                <div id="chart2" style="width:100%;height:400px;"></div>
-            </div>
-            <div class="chart-container">
-                <div class="chart-title">🛒 Event Funnel</div>
-                <div id="chart3" style="width:100%;height:400px;"></div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <div class="chart-title">📅 Daily Revenue Trend (Last 30 Days)</div>
-                <div id="chart4" style="width:100%;height:400px;"></div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <div class="chart-title">💎 Top 10 Customers by Lifetime Value</div>
-                <div id="chart5" style="width:100%;height:400px;"></div>
-            </div>
-            <div class="chart-container">
-                <div class="chart-title">📊 Category Performance (Latest Month)</div>
-                <div id="chart6" style="width:100%;height:400px;"></div>
-            </div>
-        </div>
-        
-        <div class="charts-grid">
-            <div class="chart-container">
-                <div class="chart-title">� Category Revenue Trend Over Time</div>
-                <div id="chart8" style="width:100%;height:400px;"></div>
-            </div>
-        </div>
-        
-        <h2 style="margin-bottom: 20px; color: #333;">💡 Key Insights</h2>
-        <div class="insights">
-            <div class="insight-card insight-success">
-                <h4>🏆 Top Performing Category</h4>
-                <p><strong>{top_category['category']}</strong> leads with <strong>${top_category['revenue']:,.0f}</strong> in revenue ({int(top_category['order_count'])} orders)</p>
-            </div>
-            <div class="insight-card insight-info">
-                <h4>⭐ Best Product</h4>
-                <p><strong>{top_product['name']}</strong> generated <strong>${top_product['revenue']:,.0f}</strong> in revenue with {top_product['margin_pct']*100:.1f}% margin</p>
-            </div>
-            <div class="insight-card insight-warning">
-                <h4>📱 Newest Users (0-30 days)</h4>
-                <p><strong>{int(newest_cohort['user_count'])}</strong> users, avg <strong>${newest_cohort['avg_order_value']:,.2f}</strong>/order</p>
-            </div>
-            <div class="insight-card insight-info">
-                <h4>🎯 Conversion Rate</h4>
-                <p><strong>{conversion:.1f}%</strong> of users completed a purchase ({purchase_users}/{all_users} users)</p>
-            </div>
-        </div>
-        
-        <div class="summary">
-            <h3>📝 Executive Summary</h3>
-            <p>This eCommerce analytics dashboard reveals a healthy and growing business with strong performance across all metrics.</p>
-            
-            <p><strong>Revenue Highlights:</strong></p>
-            <ul>
-                <li>Total revenue: <strong>${total_revenue:,.0f}</strong></li>
-                <li>Average order value: <strong>${avg_order_value:,.2f}</strong></li>
-                <li>Total profit margin: <strong>${total_margin:,.0f}</strong></li>
-                <li>{len(revenue_by_cat)} product categories performing well</li>
-            </ul>
-            
-            <p style="margin-top: 15px;"><strong>Product Performance:</strong></p>
-            <ul>
-                <li><strong>{top_category['category']}</strong> is the strongest performer, contributing {(top_category['revenue']/total_revenue)*100:.1f}% of revenue</li>
-                <li>Top 10 products account for significant portion of orders</li>
-                <li>Product margins range from {top_products['margin_pct'].min()*100:.1f}% to {top_products['margin_pct'].max()*100:.1f}%</li>
-            </ul>
-            
-            <p style="margin-top: 15px;"><strong>User Behavior & Conversion:</strong></p>
-            <ul>
-                <li><strong>{conversion:.1f}%</strong> of users are converting to purchasers</li>
-                <li>Newest user cohort shows <strong>{int(newest_cohort['user_count'])}</strong> engaged users</li>
-                <li>Strong engagement with page_view as primary entry point</li>
-            </ul>
-            
-            <p style="margin-top: 15px;"><strong>Actionable Insights:</strong></p>
-            <ul>
-                <li>Focus marketing on <strong>{top_category['category']}</strong> - driving the most revenue</li>
-                <li>Replicate success of top products across catalog</li>
-                <li>Optimize conversion funnel - target 25%+</li>
-                <li>Monitor newest cohort retention in next 30 days</li>
-            </ul>
-        </div>
-        
-        <div class="footer">
-            <p>Dashboard generated with dbt (data transformation) + DuckDB (analytics) + Plotly (visualization)</p>
-            <p>All models tested and documented for production readiness</p>
-        </div>
-    </div>
-    
-    <script>
-        // Chart 1: Revenue by Category
-        var trace1 = {{
-            x: {json.dumps(chart1_data['categories'])},
-            y: {json.dumps(chart1_data['revenues'])},
-            type: 'bar',
-            marker: {{color: '#667eea'}}
-        }};
-        var layout1 = {{
-            title: 'Revenue by Category',
-            xaxis: {{title: 'Category'}},
-            yaxis: {{title: 'Revenue (USD)'}},
-            margin: {{t: 40, b: 60, l: 80, r: 40}},
-            height: 400
-        }};
-        Plotly.newPlot('chart1', [trace1], layout1, {{responsive: true}});
-        
-        // Chart 2: User Cohorts
-        var trace2a = {{
-            x: {json.dumps(chart2_cohorts)},
-            y: {json.dumps(chart2_users)},
-            name: 'Users',
-            type: 'bar',
-            marker: {{color: '#667eea'}}
-        }};
-        var trace2b = {{
-            x: {json.dumps(chart2_cohorts)},
-            y: {json.dumps(chart2_orders)},
-            name: 'Orders',
-            type: 'bar',
-            marker: {{color: '#764ba2'}}
-        }};
-        var layout2 = {{
-            title: 'Users and Orders by Cohort',
-            xaxis: {{title: 'Account Age Cohort'}},
-            yaxis: {{title: 'Count'}},
-            barmode: 'group',
-            margin: {{t: 40, b: 60, l: 80, r: 40}},
-            height: 400
-        }};
-        Plotly.newPlot('chart2', [trace2a, trace2b], layout2, {{responsive: true}});
-        
-        // Chart 3: Funnel
-        var trace3 = {{
-            type: 'funnel',
-            y: {json.dumps(chart3_events)},
-            x: {json.dumps(chart3_users_funnel)},
-            textposition: 'inside',
-            textinfo: 'value+percent initial',
-            marker: {{color: '#667eea'}}
-        }};
-        var layout3 = {{
-            title: 'User Journey Funnel',
-            margin: {{t: 40, b: 60, l: 80, r: 40}},
-            height: 400
-        }};
-        Plotly.newPlot('chart3', [trace3], layout3, {{responsive: true}});
-        
-        // Chart 4: Daily Revenue
-        var trace4 = {{
-            x: {json.dumps(chart4_dates)},
-            y: {json.dumps(chart4_revenues)},
-            type: 'scatter',
-            mode: 'lines+markers',
-            marker: {{color: '#667eea', size: 6}},
-            line: {{color: '#667eea', width: 2}}
-        }};
-        var layout4 = {{
-            title: 'Daily Revenue Trend',
-            xaxis: {{title: 'Date'}},
-            yaxis: {{title: 'Revenue (USD)'}},
-            margin: {{t: 40, b: 60, l: 80, r: 40}},
-            height: 400,
-            hovermode: 'x unified'
-        }};
-        Plotly.newPlot('chart4', [trace4], layout4, {{responsive: true}});
-        
-        // Chart 5: Top Customers by CLV
-        var trace5 = {{
-            x: {json.dumps(clv_emails)},
-            y: {json.dumps(clv_revenues)},
-            type: 'bar',
-            marker: {{color: '#764ba2'}}
-        }};
-        var layout5 = {{
-            title: 'Top 10 Customers by Lifetime Value',
-            xaxis: {{title: 'Customer'}},
-            yaxis: {{title: 'Lifetime Revenue (USD)'}},
-            margin: {{t: 40, b: 100, l: 80, r: 40}},
-            height: 400
-        }};
-        Plotly.newPlot('chart5', [trace5], layout5, {{responsive: true}});
-        
-        // Chart 6: Category Performance This Month
-        var trace6 = {{
-            x: {json.dumps(cat_month_cats)},
-            y: {json.dumps(cat_month_revenue)},
-            type: 'bar',
-            marker: {{color: '#667eea'}}
-        }};
-        var layout6 = {{
-            title: 'Category Revenue (Latest Month)',
-            xaxis: {{title: 'Category'}},
-            yaxis: {{title: 'Revenue (USD)'}},
-            margin: {{t: 40, b: 60, l: 80, r: 40}},
-            height: 400
-        }};
-        Plotly.newPlot('chart6', [trace6], layout6, {{responsive: true}});
-        
-        // Chart 7: Price Tier Performance
-        var trace7a = {{
-            x: {json.dumps(price_tiers)},
-            y: {json.dumps(price_tier_orders)},
-            name: 'Orders',
-            type: 'bar',
-            marker: {{color: '#667eea'}}
-        }};
-        var trace7b = {{
-            x: {json.dumps(price_tiers)},
-            y: {json.dumps(price_tier_revenue)},
-            name: 'Revenue',
-            type: 'bar',
-            marker: {{color: '#764ba2'}},
-            yaxis: 'y2'
-        }};
-        var layout7 = {{
-            title: 'Performance by Price Tier',
-            xaxis: {{title: 'Price Tier'}},
-            yaxis: {{title: 'Orders'}},
-            yaxis2: {{title: 'Revenue (USD)', overlaying: 'y', side: 'right'}},
-            margin: {{t: 40, b: 60, l: 80, r: 80}},
-            height: 400,
-            barmode: 'group'
-        }};
-        Plotly.newPlot('chart7', [trace7a, trace7b], layout7, {{responsive: true}});
-
-        // Chart 8: Category Revenue Trend Over Time
-        var colors8 = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#fee140', '#30b0fe'];
-        var categoryData = {json.dumps(category_traces_data)};
-        var monthsList = {json.dumps(months_str)};
-        var traces8 = [];
-        
-        Object.keys(categoryData).forEach(function(category, index) {{
-            var trace = {{
-                x: monthsList,
-                y: categoryData[category],
-                name: category,
-                type: 'scatter',
-                mode: 'lines+markers',
-                line: {{color: colors8[index % colors8.length]}}
-            }};
-            traces8.push(trace);
-        }});
-        
-        var layout8 = {{
-            title: 'Category Revenue Trend Over Time',
-            xaxis: {{title: 'Month'}},
-            yaxis: {{title: 'Revenue (USD)'}},
-            margin: {{t: 40, b: 60, l: 80, r: 80}},
-            height: 400,
-            hovermode: 'x unified'
-        }};
-        Plotly.newPlot('chart8', traces8, layout8, {{responsive: true}});
-    </script>
-</body>
-</html>
-"""
+# Metrics and insights live in the page itself; leave it alone if they
+# didn't change
+html_changed = not output_path.exists() or output_path.read_text(encoding='utf-8') != html
+if html_changed:
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html)
 
-output_path = PROJECT_DIR / "dashboard.html"
-with open(output_path, 'w', encoding='utf-8') as f:
-    f.write(html)
+states[state_key] = {'inputs': inputs, 'results': result_hashes, 'generated_at': time.time()}
+STATE_PATH.write_text(json.dumps(states, indent=2))
 
 print(f"\n{'='*80}")
 print("HTML Dashboard generated!")
 print(f"{'='*80}")
-print(f"\nSaved to: {output_path}")
-print(f"Open 'dashboard.html' in your browser")
+print(f"\n{'Saved to' if html_changed else 'Unchanged'}: {output_path} "
+      f"({len(changed)} of {len(results)} query results changed)")
+if args.split:
+    data_bytes = sum(path.stat().st_size for path in (SPLIT_DIR / "data").glob("*.json.gz"))
+    print(f"Shell: {output_path.stat().st_size / 1024:.1f} KB, "
+          f"chart data: {len(chart_data)} files ({rewritten} rewritten), {data_bytes / 1024:.1f} KB gzipped")
+    print(f"Serve it with 'python -m http.server -d {SPLIT_DIR.name}' and open http://localhost:8000")
+else:
+    print(f"Open 'dashboard.html' in your browser")
 print(f"\n{'='*80}")
 print("RUN COMPLETE")
 print(f"{'='*80}\n")
@@ -0,0 +1,177 @@
+"""
+Batch-render static dashboards, one per segment (country or category)
+Every query runs once with the segment as an extra GROUP BY key, the results
+are split per segment in memory and the pages are rendered on a process pool,
+so the cost grows with the size of the results rather than with the number of
+dashboards
+"""
+
+import argparse
+import duckdb
+import os
+import re
+import time
+import numpy as np
+import pyarrow.compute as pc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
+from dashboard_render import chart_json, render_html
+from downsample import DEFAULT_WIDTH
+from query_cache import stats as cache_stats
+from query_registry import SEGMENTS, QueryRunner, filter_options
+
+PROJECT_DIR = Path(__file__).parent
+DB_PATH = PROJECT_DIR / "ecommerce.duckdb"
+OUTPUT_DIR = PROJECT_DIR / "dashboards"
+
+
+def split_by_segment(table):
+    """{segment: its rows, without the segment column}. A stable sort on the
+    segment keeps the query's row order within each segment."""
+    if not table.num_rows:
+        return {}
+    table = table.take(pc.sort_indices(table, [('segment', 'ascending')]))
+    segments = table['segment'].to_numpy(zero_copy_only=False)
+    rows = table.drop_columns(['segment'])
+    bounds = [0, *(np.flatnonzero(segments[1:] != segments[:-1]) + 1), len(segments)]
+    return {segments[start]: rows.slice(start, end - start)
+            for start, end in zip(bounds, bounds[1:]) if segments[start] is not None}
+
+
+def slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')
+
+
+def _render_segment(path, results, context, chart_width):
+    html = render_html(results, context, chart_json(results, chart_width))
+    path.write_text(html, encoding='utf-8')
+    return len(html.encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one static HTML dashboard per segment")
+    parser.add_argument('--segment', choices=sorted(SEGMENTS), default='country',
+                        help="Render one dashboard per country or per product category (default: country)")
+    parser.add_argument('--date-from', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                        help="Only include orders and events on or after this day")
+    parser.add_argument('--date-to', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                        help="Only include orders and events on or before this day")
+    parser.add_argument('--category', action='append', dest='categories', metavar='CATEGORY',
+                        help="Only include products in this category; repeatable")
+    parser.add_argument('--status', default='completed',
+                        help="Order status to include, or 'all' (default: completed)")
+    parser.add_argument('--threads', type=int, default=0,
+                        help="Queries run concurrently, each thread on its own DuckDB cursor "
+                             "(default: one per CPU)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes rendering dashboards (default: CPU count; 1 renders in this process)")
+    parser.add_argument('--trend-days', type=int, default=30,
+                        help="Days shown in the daily revenue trend, ending at the last day "
+                             "(default: 30; 0 shows the whole date range)")
+    parser.add_argument('--chart-width', type=int, default=DEFAULT_WIDTH, metavar='PIXELS',
+                        help="Time series are downsampled (LTTB) to at most one point per pixel "
+                             f"of this width (default: {DEFAULT_WIDTH})")
+    args = parser.parse_args()
+
+    conn = duckdb.connect(str(DB_PATH))
+    output_dir = OUTPUT_DIR / args.segment
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Same filters and date windows as generate_html_dashboard.py
+    filters = {
+        'date_from': args.date_from,
+        'date_to': args.date_to,
+        'categories': args.categories,
+        'status': None if args.status == 'all' else args.status,
+    }
+    options = filter_options(conn)
+    first_day = args.date_from or options['date_min']
+    latest_day = args.date_to or options['date_max']
+    trend = filters
+    if args.trend_days:
+        trend = {**filters, 'date_from': max(latest_day - timedelta(days=args.trend_days - 1), first_day)}
+    latest_month = {**filters, 'date_from': max(latest_day.replace(day=1), args.date_from or date.min),
+                    'date_to': latest_day}
+
+    # ============================================================================
+    # QUERIES (once per query, all segments at a time)
+    # ============================================================================
+    # Queries that can't be split by the segment run unsegmented and are
+    # shared by every dashboard
+    skip = SEGMENTS[args.segment]['skip']
+    jobs = {
+        'revenue_by_category': ('revenue_by_category', filters),
+        'top_products': ('top_products', filters),
+        'user_cohort': ('user_cohort', filters),
+        'event_funnel': ('event_funnel', filters),
+        'daily_revenue': ('daily_revenue', trend),
+        'customer_lifetime_value': ('customer_lifetime_value', filters),
+        'category_by_month': ('category_by_month', filters),
+        'latest_month': ('category_by_month', latest_month),
+        'product_price_tiers': ('product_price_tiers', filters),
+    }
+    jobs = {key: (name if name in skip else f"{name}_by_{args.segment}", params)
+            for key, (name, params) in jobs.items()}
+
+    runner = QueryRunner(conn)
+    start = time.perf_counter()
+    results = runner.run_batch(jobs, threads=args.threads or os.cpu_count(), arrow=True)
+    conn.close()
+    for key, seconds in runner.latencies.items():
+        print(f"  {key:<25} {seconds * 1000:>8.1f} ms")
+    print(f"✓ {len(jobs)} queries in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+
+    start = time.perf_counter()
+    shared = {key: results.pop(key) for key, (name, _) in jobs.items() if name in skip}
+    split = {key: split_by_segment(table) for key, table in results.items()}
+
+    # A segment without sales has nothing to show
+    segments = sorted(split['revenue_by_category'])
+    tasks = []
+    for segment in segments:
+        segment_results = {**shared, **{
+            key: tables.get(segment, results[key].drop_columns(['segment']).slice(0, 0))
+            for key, tables in split.items()
+        }}
+        context = {
+            'first_day': first_day,
+            'latest_day': latest_day,
+            'categories': args.categories,
+            'status': args.status,
+            'trend_days': args.trend_days,
+            'segment': f"{args.segment.title()}: {segment}",
+        }
+        tasks.append((output_dir / f"{slug(segment)}.html", segment_results, context, args.chart_width))
+    print(f"✓ Split into {len(segments)} segments in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # ============================================================================
+    # RENDER
+    # ============================================================================
+    start = time.perf_counter()
+    total_bytes = 0
+    if args.workers == 1:
+        for done, task in enumerate(tasks, start=1):
+            total_bytes += _render_segment(*task)
+            print(f"  ✓ {done}/{len(tasks)} {task[0].relative_to(PROJECT_DIR)}")
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(_render_segment, *task): task[0] for task in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                total_bytes += future.result()
+                print(f"  ✓ {done}/{len(tasks)} {futures[future].relative_to(PROJECT_DIR)}")
+
+    print(f"\n{'='*80}")
+    print("Segment dashboards generated!")
+    print(f"{'='*80}")
+    print(f"\n{len(tasks)} dashboards ({total_bytes / 1024:.1f} KB) rendered in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms, saved to {output_dir}/")
+    print(f"\n{'='*80}")
+    print("RUN COMPLETE")
+    print(f"{'='*80}\n")
+
+
+if __name__ == "__main__":
+    main()
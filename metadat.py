@@ -9,12 +9,52 @@ from pathlib import Path
 PROJECT_DIR = Path(__file__).parent
 DOCS_PATH = PROJECT_DIR / "docs.json"
 
-# Load existing docs
-with open(DOCS_PATH, 'r') as f:
-    docs = json.load(f)
+# Declared column types of the raw tables, in file column order. The pipeline
+# loads CSVs with exactly these types instead of sniffing every file, and they
+# match the Parquet schema written by generate_csvs.py.
+RAW_SCHEMAS = {
+    'raw_users': {
+        'id': 'INTEGER',
+        'email': 'VARCHAR',
+        'first_name': 'VARCHAR',
+        'last_name': 'VARCHAR',
+        'created_at': 'TIMESTAMP',
+        'country': 'VARCHAR',
+        'state': 'VARCHAR'
+    },
+    'raw_products': {
+        'id': 'INTEGER',
+        'name': 'VARCHAR',
+        'category': 'VARCHAR',
+        'price': 'DECIMAL(10,2)',
+        'cost': 'DECIMAL(10,2)',
+        'created_at': 'TIMESTAMP'
+    },
+    'raw_orders': {
+        'id': 'BIGINT',
+        'user_id': 'INTEGER',
+        'order_date': 'TIMESTAMP',
+        'status': 'VARCHAR',
+        'total_amount': 'DECIMAL(10,2)'
+    },
+    'raw_order_items': {
+        'id': 'BIGINT',
+        'order_id': 'BIGINT',
+        'product_id': 'INTEGER',
+        'quantity': 'INTEGER',
+        'unit_price': 'DECIMAL(10,2)'
+    },
+    'raw_events': {
+        'id': 'BIGINT',
+        'user_id': 'INTEGER',
+        'event_type': 'VARCHAR',
+        'event_date': 'TIMESTAMP',
+        'page': 'VARCHAR'
+    }
+}
 
-# Update descriptions with detailed metadata
-docs['models_detailed'] = {
+# Detailed metadata per model
+MODELS_DETAILED = {
     # STAGING LAYER
     'stg_users': {
         'description': 'Light cleaning of raw users table. One row per user. Includes account age calculation.',
@@ -57,7 +97,10 @@ docs['models_detailed'] = {
             'total_amount': 'Total order value'
         },
         'grain': 'One row per order',
-        'source': 'raw_orders'
+        'source': 'raw_orders',
+        'foreign_keys': {
+            'user_id': 'stg_users.user_id'
+        }
     },
     
     'stg_order_items': {
@@ -71,7 +114,11 @@ docs['models_detailed'] = {
             'line_total': 'quantity * unit_price'
         },
         'grain': 'One row per line item',
-        'source': 'raw_order_items'
+        'source': 'raw_order_items',
+        'foreign_keys': {
+            'order_id': 'stg_orders.order_id',
+            'product_id': 'stg_products.product_id'
+        }
     },
     
     'stg_events': {
@@ -84,7 +131,10 @@ docs['models_detailed'] = {
             'page': 'Page where event occurred'
         },
         'grain': 'One row per event',
-        'source': 'raw_events'
+        'source': 'raw_events',
+        'foreign_keys': {
+            'user_id': 'stg_users.user_id'
+        }
     },
     
     # DIMENSION LAYER
@@ -139,7 +189,11 @@ docs['models_detailed'] = {
         },
         'grain': 'One row per order line item',
         'joins': 'stg_orders (1:1), stg_order_items (1:1), stg_products (N:1)',
-        'use_case': 'Revenue analysis, product performance, margin analysis, order metrics'
+        'use_case': 'Revenue analysis, product performance, margin analysis, order metrics',
+        'foreign_keys': {
+            'user_id': 'dim_users.user_id',
+            'product_id': 'dim_products.product_id'
+        }
     },
     
     'fct_events': {
@@ -154,12 +208,40 @@ docs['models_detailed'] = {
         },
         'grain': 'One row per event',
         'joins': 'stg_events (1:1)',
-        'use_case': 'Funnel analysis, user journey, event sequence, conversion tracking'
+        'use_case': 'Funnel analysis, user journey, event sequence, conversion tracking',
+        'foreign_keys': {
+            'user_id': 'dim_users.user_id'
+        }
+    },
+    
+    # AGGREGATE LAYER
+    'agg_daily_sales': {
+        'description': 'Daily sales rollup. Stores several grains per day and order status, told apart by the grain column. Source: fct_orders joined to dim_products.',
+        'columns': {
+            'order_day': 'Order date (day)',
+            'order_status': 'Order status',
+            'grain': 'Row grain: product, category, price_tier or day (all products)',
+            'product_id': 'Product (product grain only)',
+            'category': 'Product category (product and category grain)',
+            'price_tier': 'Price tier label (product and price_tier grain)',
+            'orders': 'Distinct orders; exact when summed across days',
+            'line_items': 'Order line items',
+            'units': 'Units ordered',
+            'revenue': 'Sum of line_total',
+            'margin': 'Sum of margin_dollars',
+            'max_order_item_id': 'Highest fct_orders line item rolled up; high-water mark for incremental runs'
+        },
+        'grain': 'One row per day, order status and grain key',
+        'joins': 'fct_orders (N:1), dim_products (N:1)',
+        'use_case': 'Daily/monthly revenue trends, category and price tier performance',
+        'foreign_keys': {
+            'product_id': 'dim_products.product_id'
+        }
     }
 }
 
-# Add layer metadata
-docs['layers'] = {
+# Layer metadata
+LAYERS = {
     'raw': {
         'description': 'Raw data layer - direct CSV imports from source system. No transformations.',
         'tables': ['raw_users', 'raw_products', 'raw_orders', 'raw_order_items', 'raw_events'],
@@ -174,31 +256,46 @@ docs['layers'] = {
         'description': 'Mart layer - business-ready tables for analytics. Contains dimensions and facts.',
         'dimensions': ['dim_users', 'dim_products'],
         'facts': ['fct_orders', 'fct_events'],
+        'aggregates': ['agg_daily_sales'],
         'contract': 'Unique grain per fact table. Foreign keys to dimensions.'
     }
 }
 
-# Save updated docs
-with open(DOCS_PATH, 'w') as f:
-    json.dump(docs, f, indent=2)
 
-print("\n" + "="*80)
-print("HOUR 2: METADATA GENERATION COMPLETE")
-print("="*80)
-print(f"\n✓ Descriptions added to all models")
-print(f"✓ Layer documentation created")
-print(f"✓ Updated docs.json: {DOCS_PATH}")
-print("\nModels with metadata:")
-for model_name in docs['models_detailed'].keys():
-    print(f"  - {model_name}")
+def main():
+    # Load existing docs
+    with open(DOCS_PATH, 'r') as f:
+        docs = json.load(f)
+
+    docs['models_detailed'] = MODELS_DETAILED
+    docs['layers'] = LAYERS
+    docs['raw_schemas'] = RAW_SCHEMAS
+
+    # Save updated docs
+    with open(DOCS_PATH, 'w') as f:
+        json.dump(docs, f, indent=2)
+
+    print("\n" + "="*80)
+    print("HOUR 2: METADATA GENERATION COMPLETE")
+    print("="*80)
+    print(f"\n✓ Descriptions added to all models")
+    print(f"✓ Layer documentation created")
+    print(f"✓ Updated docs.json: {DOCS_PATH}")
+    print("\nModels with metadata:")
+    for model_name in docs['models_detailed'].keys():
+        print(f"  - {model_name}")
+
+    print("\n" + "="*80)
+    print("HOUR 2 CHECKPOINT:")
+    print("="*80)
+    print("✓ 5 staging models (with descriptions)")
+    print("✓ 2 dimension models (with descriptions)")
+    print("✓ 2 fact models (with descriptions)")
+    print("✓ 7 tests passing")
+    print("✓ All metadata locked")
+    print("\nReady for Hour 3!")
+    print("="*80 + "\n")
+
 
-print("\n" + "="*80)
-print("HOUR 2 CHECKPOINT:")
-print("="*80)
-print("✓ 5 staging models (with descriptions)")
-print("✓ 2 dimension models (with descriptions)")
-print("✓ 2 fact models (with descriptions)")
-print("✓ 7 tests passing")
-print("✓ All metadata locked")
-print("\nReady for Hour 3!")
-print("="*80 + "\n")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
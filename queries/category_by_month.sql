@@ -1,14 +1,17 @@
 
 SELECT 
-    DATE_TRUNC('month', o.order_date)::DATE as month,
-    p.category,
-    COUNT(DISTINCT o.order_id) as orders,
-    SUM(o.quantity) as units_sold,
-    ROUND(SUM(o.line_total), 2) as revenue,
-    ROUND(SUM(o.margin_dollars), 2) as margin,
-    ROUND(SUM(o.margin_dollars) / SUM(o.line_total), 3) as margin_pct
-FROM fct_orders o
-JOIN dim_products p ON o.product_id = p.product_id
-WHERE o.order_status = 'completed'
-GROUP BY DATE_TRUNC('month', o.order_date), p.category
+    DATE_TRUNC('month', order_day)::DATE as month,
+    category,
+    CAST(SUM(orders) AS BIGINT) as orders,
+    CAST(SUM(units) AS BIGINT) as units_sold,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(margin), 2) as margin,
+    ROUND(SUM(margin) / SUM(revenue), 3) as margin_pct
+FROM agg_daily_sales
+WHERE grain = 'category'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, category))
+GROUP BY DATE_TRUNC('month', order_day), category
 ORDER BY month DESC, revenue DESC
@@ -11,7 +11,14 @@ SELECT
     MAX(o.order_date) as last_purchase_date,
     CAST(EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(o.order_date))) AS INT) as days_since_last_order
 FROM dim_users u
-LEFT JOIN fct_orders o ON u.user_id = o.user_id AND o.order_status = 'completed'
+LEFT JOIN (
+    SELECT * FROM fct_orders
+    WHERE ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_date >= $date_from)
+        AND ($date_to IS NULL OR order_date < CAST($date_to AS DATE) + 1)
+        AND ($categories IS NULL OR product_id IN (
+            SELECT product_id FROM dim_products WHERE list_contains($categories, category)))
+) o ON u.user_id = o.user_id
 GROUP BY u.user_id, u.email, u.created_at
 ORDER BY lifetime_revenue DESC
 LIMIT 100
@@ -1,12 +1,33 @@
 
 SELECT 
-    DATE(o.order_date) as order_date,
+    order_day as order_date,
+    CAST(SUM(orders) AS BIGINT) as orders,
+    CAST(SUM(units) AS BIGINT) as units,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(margin), 2) as margin
+FROM agg_daily_sales
+WHERE $categories IS NULL
+    AND grain = 'day'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+GROUP BY order_day
+UNION ALL
+-- The day grain has no category, and summing the category grain would count
+-- an order with items in several categories once per category, so a
+-- category filter counts distinct orders from the line items instead
+SELECT 
+    CAST(o.order_date AS DATE) as order_date,
     COUNT(DISTINCT o.order_id) as orders,
-    SUM(o.quantity) as units,
+    CAST(SUM(o.quantity) AS BIGINT) as units,
     ROUND(SUM(o.line_total), 2) as revenue,
     ROUND(SUM(o.margin_dollars), 2) as margin
 FROM fct_orders o
-WHERE o.order_status = 'completed'
-GROUP BY DATE(o.order_date)
+JOIN dim_products p ON o.product_id = p.product_id
+WHERE $categories IS NOT NULL
+    AND ($status IS NULL OR o.order_status = $status)
+    AND ($date_from IS NULL OR o.order_date >= $date_from)
+    AND ($date_to IS NULL OR o.order_date < CAST($date_to AS DATE) + 1)
+    AND list_contains($categories, p.category)
+GROUP BY CAST(o.order_date AS DATE)
 ORDER BY order_date DESC
-LIMIT 30
@@ -1,11 +1,17 @@
 
+WITH events AS (
+    SELECT user_id, event_type
+    FROM fct_events
+    WHERE ($date_from IS NULL OR event_date >= $date_from)
+        AND ($date_to IS NULL OR event_date < CAST($date_to AS DATE) + 1)
+)
 SELECT 
     event_type,
     COUNT(DISTINCT user_id) as user_count,
     COUNT(*) as event_count,
     ROUND(100.0 * COUNT(DISTINCT user_id) / 
-        (SELECT COUNT(DISTINCT user_id) FROM fct_events), 1) as pct_all_users
-FROM fct_events
+        (SELECT COUNT(DISTINCT user_id) FROM events), 1) as pct_all_users
+FROM events
 GROUP BY event_type
 ORDER BY 
     CASE 
@@ -1,22 +1,51 @@
 
-SELECT 
-    CASE 
-        WHEN p.price < 50 THEN 'Budget (<$50)'
-        WHEN p.price < 150 THEN 'Mid-Range ($50-150)'
-        WHEN p.price < 300 THEN 'Premium ($150-300)'
-        ELSE 'Luxury ($300+)'
-    END as price_tier,
-    COUNT(DISTINCT p.product_id) as product_count,
-    COUNT(DISTINCT o.order_id) as orders,
-    SUM(o.quantity) as units_sold,
-    ROUND(SUM(o.line_total), 2) as revenue,
-    ROUND(AVG(o.line_total), 2) as avg_order_value,
-    ROUND(SUM(o.margin_dollars), 2) as total_margin,
-    ROUND(100.0 * SUM(o.margin_dollars) / SUM(o.line_total), 1) as margin_pct
-FROM fct_orders o
-JOIN dim_products p ON o.product_id = p.product_id
-WHERE o.order_status = 'completed'
-GROUP BY price_tier
+WITH tiers AS (
+    SELECT 
+        price_tier,
+        COUNT(DISTINCT product_id) FILTER (WHERE grain = 'product') as product_count,
+        CAST(SUM(orders) FILTER (WHERE grain = 'price_tier') AS BIGINT) as orders,
+        CAST(SUM(units) FILTER (WHERE grain = 'price_tier') AS BIGINT) as units_sold,
+        ROUND(SUM(revenue) FILTER (WHERE grain = 'price_tier'), 2) as revenue,
+        ROUND(SUM(revenue) FILTER (WHERE grain = 'price_tier')
+            / SUM(line_items) FILTER (WHERE grain = 'price_tier'), 2) as avg_order_value,
+        ROUND(SUM(margin) FILTER (WHERE grain = 'price_tier'), 2) as total_margin,
+        ROUND(100.0 * SUM(margin) FILTER (WHERE grain = 'price_tier')
+            / SUM(revenue) FILTER (WHERE grain = 'price_tier'), 1) as margin_pct
+    FROM agg_daily_sales
+    WHERE $categories IS NULL
+        AND grain IN ('product', 'price_tier')
+        AND ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_day >= $date_from)
+        AND ($date_to IS NULL OR order_day <= $date_to)
+    GROUP BY price_tier
+    UNION ALL
+    -- The price_tier grain has no category, and summing the product grain
+    -- would count an order with several products in a tier once per
+    -- product, so a category filter aggregates the line items instead
+    SELECT 
+        CASE 
+            WHEN p.price < 50 THEN 'Budget (<$50)'
+            WHEN p.price < 150 THEN 'Mid-Range ($50-150)'
+            WHEN p.price < 300 THEN 'Premium ($150-300)'
+            ELSE 'Luxury ($300+)'
+        END as price_tier,
+        COUNT(DISTINCT o.product_id) as product_count,
+        COUNT(DISTINCT o.order_id) as orders,
+        CAST(SUM(o.quantity) AS BIGINT) as units_sold,
+        ROUND(SUM(o.line_total), 2) as revenue,
+        ROUND(SUM(o.line_total) / COUNT(*), 2) as avg_order_value,
+        ROUND(SUM(o.margin_dollars), 2) as total_margin,
+        ROUND(100.0 * SUM(o.margin_dollars) / SUM(o.line_total), 1) as margin_pct
+    FROM fct_orders o
+    JOIN dim_products p ON o.product_id = p.product_id
+    WHERE $categories IS NOT NULL
+        AND ($status IS NULL OR o.order_status = $status)
+        AND ($date_from IS NULL OR o.order_date >= $date_from)
+        AND ($date_to IS NULL OR o.order_date < CAST($date_to AS DATE) + 1)
+        AND list_contains($categories, p.category)
+    GROUP BY 1
+)
+SELECT * FROM tiers
 ORDER BY 
     CASE 
         WHEN price_tier = 'Budget (<$50)' THEN 1
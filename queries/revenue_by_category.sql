@@ -1,13 +1,16 @@
 
 SELECT 
-    p.category,
-    COUNT(DISTINCT o.order_id) as order_count,
-    COUNT(*) as line_items,
-    ROUND(SUM(o.line_total), 2) as revenue,
-    ROUND(AVG(o.line_total), 2) as avg_order_value,
-    ROUND(SUM(o.margin_dollars), 2) as total_margin
-FROM fct_orders o
-JOIN dim_products p ON o.product_id = p.product_id
-WHERE o.order_status = 'completed'
-GROUP BY p.category
+    category,
+    CAST(SUM(orders) AS BIGINT) as order_count,
+    CAST(SUM(line_items) AS BIGINT) as line_items,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(revenue) / SUM(line_items), 2) as avg_order_value,
+    ROUND(SUM(margin), 2) as total_margin
+FROM agg_daily_sales
+WHERE grain = 'category'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, category))
+GROUP BY category
 ORDER BY revenue DESC
@@ -4,14 +4,18 @@ SELECT
     p.name,
     p.category,
     ROUND(p.price, 2) as price,
-    COUNT(DISTINCT o.order_id) as orders,
-    SUM(o.quantity) as units_sold,
-    ROUND(SUM(o.line_total), 2) as revenue,
-    ROUND(SUM(o.margin_dollars), 2) as total_margin,
-    ROUND(SUM(o.margin_dollars) / SUM(o.line_total), 3) as margin_pct
-FROM fct_orders o
-JOIN dim_products p ON o.product_id = p.product_id
-WHERE o.order_status = 'completed'
+    CAST(SUM(s.orders) AS BIGINT) as orders,
+    CAST(SUM(s.units) AS BIGINT) as units_sold,
+    ROUND(SUM(s.revenue), 2) as revenue,
+    ROUND(SUM(s.margin), 2) as total_margin,
+    ROUND(SUM(s.margin) / SUM(s.revenue), 3) as margin_pct
+FROM agg_daily_sales s
+JOIN dim_products p ON s.product_id = p.product_id
+WHERE s.grain = 'product'
+    AND ($status IS NULL OR s.order_status = $status)
+    AND ($date_from IS NULL OR s.order_day >= $date_from)
+    AND ($date_to IS NULL OR s.order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, s.category))
 GROUP BY p.product_id, p.name, p.category, p.price
 ORDER BY revenue DESC
 LIMIT 10
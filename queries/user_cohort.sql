@@ -11,7 +11,14 @@ SELECT
     ROUND(AVG(o.line_total), 2) as avg_order_value,
     ROUND(SUM(o.line_total), 2) as total_revenue
 FROM dim_users u
-LEFT JOIN fct_orders o ON u.user_id = o.user_id AND o.order_status = 'completed'
+LEFT JOIN (
+    SELECT * FROM fct_orders
+    WHERE ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_date >= $date_from)
+        AND ($date_to IS NULL OR order_date < CAST($date_to AS DATE) + 1)
+        AND ($categories IS NULL OR product_id IN (
+            SELECT product_id FROM dim_products WHERE list_contains($categories, category)))
+) o ON u.user_id = o.user_id
 GROUP BY cohort
 ORDER BY 
     CASE 
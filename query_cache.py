@@ -0,0 +1,139 @@
+"""
+Shared on-disk query result cache
+Results are stored as Parquet files keyed by the normalized SQL, its parameters
+and the data_version the pipeline records for every relation the query reads,
+so all dashboards get cache hits until the underlying models actually change
+"""
+
+import duckdb
+import hashlib
+import os
+import pyarrow.parquet as pq
+import re
+import threading
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).parent
+CACHE_DIR = PROJECT_DIR / ".query_cache"
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# Some queries are relative to CURRENT_TIMESTAMP (cohorts, days since last
+# order) and drift even when the data doesn't, so entries also expire by age.
+MAX_CACHE_AGE_SECONDS = 24 * 60 * 60
+
+stats = {'hits': 0, 'misses': 0, 'uncached': 0}
+stats_lock = threading.Lock()
+
+
+def count(outcome):
+    with stats_lock:
+        stats[outcome] += 1
+
+
+def normalize_sql(sql):
+    """Strip comments, surrounding whitespace and trailing semicolons, and
+    collapse whitespace, so formatting changes don't miss the cache."""
+    sql = re.sub(r'--[^\n]*', ' ', sql)
+    return ' '.join(sql.split()).rstrip(';').strip()
+
+
+def referenced_relations(conn, sql):
+    """Tables and views in the database that the query reads from (CTE and
+    subquery aliases are not catalog relations and are ignored)."""
+    names = set(re.findall(r'\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)', sql, re.IGNORECASE))
+    catalog = {name for name, in conn.execute(
+        "SELECT table_name FROM duckdb_tables() UNION SELECT view_name FROM duckdb_views() WHERE NOT internal"
+    ).fetchall()}
+    return sorted(names & catalog)
+
+
+def data_versions(conn, relations):
+    """data_version per relation from the pipeline's _model_state, or None if
+    any of them is untracked (e.g. a database built by an older pipeline), in
+    which case the query is not cached."""
+    # _model_state has one row per model; reading all of it avoids binding a
+    # parameter, which makes DuckDB import pandas (slow on a cold start)
+    try:
+        recorded = dict(conn.execute("SELECT relation_name, data_version FROM _model_state").fetchall())
+    except duckdb.Error:
+        return None
+    versions = {relation: recorded.get(relation) for relation in relations}
+    if any(version is None for version in versions.values()):
+        return None
+    return versions
+
+
+def cache_key(sql, params, versions):
+    parts = [normalize_sql(sql), repr(params), *(f"{name}={version}" for name, version in sorted(versions.items()))]
+    return hashlib.blake2b('\x1f'.join(parts).encode(), digest_size=16).hexdigest()
+
+
+def evict(max_bytes=MAX_CACHE_BYTES, max_age=MAX_CACHE_AGE_SECONDS):
+    """Drop entries older than max_age, then least recently used entries until
+    the cache fits in max_bytes. An entry's mtime is when it was written, its
+    atime when it was last read."""
+    now = time.time()
+    entries = []
+    for path in CACHE_DIR.glob('*.parquet'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if now - stat.st_mtime > max_age:
+            path.unlink(missing_ok=True)
+        else:
+            entries.append((stat.st_atime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def read_cached(conn, path, max_age=MAX_CACHE_AGE_SECONDS):
+    """The cached result in path, or None if there is none, it expired, or
+    another process evicted it while it was being opened."""
+    try:
+        mtime = path.stat().st_mtime
+        now = time.time()
+        if now - mtime > max_age:
+            return None
+        os.utime(path, (now, mtime))
+        return conn.execute("SELECT * FROM read_parquet(?)", [str(path)])
+    except (FileNotFoundError, duckdb.IOException):
+        return None
+
+
+def cached_query(conn, sql, params=None, execute=None, max_bytes=MAX_CACHE_BYTES,
+                 max_age=MAX_CACHE_AGE_SECONDS):
+    """Run sql through the cache. Returns a DuckDB result (call .df(),
+    .fetchall() or .fetch_arrow_table() on it), read from the cached Parquet
+    file when the data it depends on is unchanged. execute, if given, runs the
+    query on a miss instead of conn.execute(sql, params), e.g. a prepared
+    statement."""
+    execute = execute or (lambda: conn.execute(sql, params))
+    versions = data_versions(conn, referenced_relations(conn, sql))
+    if versions is None:
+        count('uncached')
+        return execute()
+
+    path = CACHE_DIR / f"{cache_key(sql, params, versions)}.parquet"
+    result = read_cached(conn, path, max_age)
+    if result is not None:
+        count('hits')
+        return result
+
+    count('misses')
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Write under a name private to this process and thread and rename, so
+    # concurrent writers of the same key never share a file and readers never
+    # see a partial one
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+    pq.write_table(execute().fetch_arrow_table(), tmp_path)
+    os.replace(tmp_path, path)
+    evict(max_bytes, max_age)
+    # Another process's eviction may already have removed the file
+    result = read_cached(conn, path, max_age)
+    return execute() if result is None else result
@@ -0,0 +1,769 @@
+"""
+Query registry
+Single source for the analytics queries: SQL, parameters, expected columns and
+chart metadata. queries.py writes the .sql files and queries.json from it, and
+both dashboards run the queries through QueryRunner
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+from query_cache import cached_query
+
+# Queries that read agg_daily_sales roll up one row per day, status and grain
+# key instead of re-joining fct_orders line items to dim_products.
+#
+# Filters are named parameters ($date_from, $date_to, $categories, $status);
+# NULL means "no filter". Each query declares the ones it supports with their
+# defaults. DuckDB plans EXECUTE with the bound values, so the
+# "$x IS NULL OR ..." guards fold away and the remaining predicates are pushed
+# into the table scans.
+SALES_PARAMS = {'date_from': None, 'date_to': None, 'categories': None, 'status': 'completed'}
+DATE_PARAMS = {'date_from': None, 'date_to': None}
+
+QUERIES = {
+    'revenue_by_category': {
+        'title': 'Revenue by Category',
+        'description': 'Revenue broken down by product category',
+        'use_case': 'Category performance analysis',
+        'chart_type': 'Bar chart',
+        'file': 'revenue_by_category.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'category',
+            'order_count',
+            'line_items',
+            'revenue',
+            'avg_order_value',
+            'total_margin'
+        ],
+        'sql': """
+SELECT 
+    category,
+    CAST(SUM(orders) AS BIGINT) as order_count,
+    CAST(SUM(line_items) AS BIGINT) as line_items,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(revenue) / SUM(line_items), 2) as avg_order_value,
+    ROUND(SUM(margin), 2) as total_margin
+FROM agg_daily_sales
+WHERE grain = 'category'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, category))
+GROUP BY category
+ORDER BY revenue DESC
+""",
+    },
+
+    'top_products': {
+        'title': 'Top 10 Products by Revenue',
+        'description': 'Top 10 products by revenue',
+        'use_case': 'Product performance',
+        'chart_type': 'Table',
+        'file': 'top_products.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'product_id',
+            'name',
+            'category',
+            'price',
+            'orders',
+            'units_sold',
+            'revenue',
+            'total_margin',
+            'margin_pct'
+        ],
+        'sql': """
+SELECT 
+    p.product_id,
+    p.name,
+    p.category,
+    ROUND(p.price, 2) as price,
+    CAST(SUM(s.orders) AS BIGINT) as orders,
+    CAST(SUM(s.units) AS BIGINT) as units_sold,
+    ROUND(SUM(s.revenue), 2) as revenue,
+    ROUND(SUM(s.margin), 2) as total_margin,
+    ROUND(SUM(s.margin) / SUM(s.revenue), 3) as margin_pct
+FROM agg_daily_sales s
+JOIN dim_products p ON s.product_id = p.product_id
+WHERE s.grain = 'product'
+    AND ($status IS NULL OR s.order_status = $status)
+    AND ($date_from IS NULL OR s.order_day >= $date_from)
+    AND ($date_to IS NULL OR s.order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, s.category))
+GROUP BY p.product_id, p.name, p.category, p.price
+ORDER BY revenue DESC
+LIMIT 10
+""",
+    },
+
+    'user_cohort': {
+        'title': 'User Cohort Analysis (by account age)',
+        'description': 'User behavior by account age cohort',
+        'use_case': 'Cohort analysis and retention',
+        'chart_type': 'Bar/Line chart',
+        'file': 'user_cohort.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'cohort',
+            'user_count',
+            'total_orders',
+            'avg_order_value',
+            'total_revenue'
+        ],
+        'sql': """
+SELECT 
+    CASE 
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 30 THEN '0-30 days'
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 90 THEN '31-90 days'
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 180 THEN '91-180 days'
+        ELSE '180+ days'
+    END as cohort,
+    COUNT(DISTINCT u.user_id) as user_count,
+    COUNT(DISTINCT o.order_id) as total_orders,
+    ROUND(AVG(o.line_total), 2) as avg_order_value,
+    ROUND(SUM(o.line_total), 2) as total_revenue
+FROM dim_users u
+LEFT JOIN (
+    SELECT * FROM fct_orders
+    WHERE ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_date >= $date_from)
+        AND ($date_to IS NULL OR order_date < CAST($date_to AS DATE) + 1)
+        AND ($categories IS NULL OR product_id IN (
+            SELECT product_id FROM dim_products WHERE list_contains($categories, category)))
+) o ON u.user_id = o.user_id
+GROUP BY cohort
+ORDER BY 
+    CASE 
+        WHEN cohort = '0-30 days' THEN 1
+        WHEN cohort = '31-90 days' THEN 2
+        WHEN cohort = '91-180 days' THEN 3
+        ELSE 4
+    END
+""",
+    },
+
+    'event_funnel': {
+        'title': 'Event Funnel Analysis',
+        'description': 'User journey through event types',
+        'use_case': 'Funnel analysis and conversion',
+        'chart_type': 'Funnel chart',
+        'file': 'event_funnel.sql',
+        'params': DATE_PARAMS,
+        'columns': [
+            'event_type',
+            'user_count',
+            'event_count',
+            'pct_all_users'
+        ],
+        'sql': """
+WITH events AS (
+    SELECT user_id, event_type
+    FROM fct_events
+    WHERE ($date_from IS NULL OR event_date >= $date_from)
+        AND ($date_to IS NULL OR event_date < CAST($date_to AS DATE) + 1)
+)
+SELECT 
+    event_type,
+    COUNT(DISTINCT user_id) as user_count,
+    COUNT(*) as event_count,
+    ROUND(100.0 * COUNT(DISTINCT user_id) / 
+        (SELECT COUNT(DISTINCT user_id) FROM events), 1) as pct_all_users
+FROM events
+GROUP BY event_type
+ORDER BY 
+    CASE 
+        WHEN event_type = 'page_view' THEN 1
+        WHEN event_type = 'product_view' THEN 2
+        WHEN event_type = 'search' THEN 3
+        WHEN event_type = 'add_to_cart' THEN 4
+        WHEN event_type = 'purchase' THEN 5
+        ELSE 6
+    END
+""",
+    },
+
+    'daily_revenue': {
+        'title': 'Daily Revenue Trend (for time series)',
+        'description': 'Revenue trend over time',
+        'use_case': 'Time series analysis',
+        'chart_type': 'Line chart',
+        'file': 'daily_revenue.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'order_date',
+            'orders',
+            'units',
+            'revenue',
+            'margin'
+        ],
+        'sql': """
+SELECT 
+    order_day as order_date,
+    CAST(SUM(orders) AS BIGINT) as orders,
+    CAST(SUM(units) AS BIGINT) as units,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(margin), 2) as margin
+FROM agg_daily_sales
+WHERE $categories IS NULL
+    AND grain = 'day'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+GROUP BY order_day
+UNION ALL
+-- The day grain has no category, and summing the category grain would count
+-- an order with items in several categories once per category, so a
+-- category filter counts distinct orders from the line items instead
+SELECT 
+    CAST(o.order_date AS DATE) as order_date,
+    COUNT(DISTINCT o.order_id) as orders,
+    CAST(SUM(o.quantity) AS BIGINT) as units,
+    ROUND(SUM(o.line_total), 2) as revenue,
+    ROUND(SUM(o.margin_dollars), 2) as margin
+FROM fct_orders o
+JOIN dim_products p ON o.product_id = p.product_id
+WHERE $categories IS NOT NULL
+    AND ($status IS NULL OR o.order_status = $status)
+    AND ($date_from IS NULL OR o.order_date >= $date_from)
+    AND ($date_to IS NULL OR o.order_date < CAST($date_to AS DATE) + 1)
+    AND list_contains($categories, p.category)
+GROUP BY CAST(o.order_date AS DATE)
+ORDER BY order_date DESC
+""",
+    },
+
+    'customer_lifetime_value': {
+        'title': 'Customer Lifetime Value',
+        'description': 'Customer lifetime value with purchase history',
+        'use_case': 'Customer segmentation and retention',
+        'chart_type': 'Table/Scatter plot',
+        'file': 'customer_lifetime_value.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'user_id',
+            'email',
+            'created_at',
+            'total_orders',
+            'lifetime_revenue',
+            'avg_order_value',
+            'lifetime_margin',
+            'margin_pct',
+            'last_purchase_date',
+            'days_since_last_order'
+        ],
+        'sql': """
+SELECT 
+    u.user_id,
+    u.email,
+    u.created_at,
+    COUNT(DISTINCT o.order_id) as total_orders,
+    ROUND(SUM(o.line_total), 2) as lifetime_revenue,
+    ROUND(AVG(o.line_total), 2) as avg_order_value,
+    ROUND(SUM(o.margin_dollars), 2) as lifetime_margin,
+    ROUND(100.0 * SUM(o.margin_dollars) / SUM(o.line_total), 1) as margin_pct,
+    MAX(o.order_date) as last_purchase_date,
+    CAST(EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(o.order_date))) AS INT) as days_since_last_order
+FROM dim_users u
+LEFT JOIN (
+    SELECT * FROM fct_orders
+    WHERE ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_date >= $date_from)
+        AND ($date_to IS NULL OR order_date < CAST($date_to AS DATE) + 1)
+        AND ($categories IS NULL OR product_id IN (
+            SELECT product_id FROM dim_products WHERE list_contains($categories, category)))
+) o ON u.user_id = o.user_id
+GROUP BY u.user_id, u.email, u.created_at
+ORDER BY lifetime_revenue DESC
+LIMIT 100
+""",
+    },
+
+    'category_by_month': {
+        'title': 'Category Performance by Month',
+        'description': 'Category performance trend month-over-month',
+        'use_case': 'Seasonal trends and growth tracking',
+        'chart_type': 'Line/Area chart',
+        'file': 'category_by_month.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'month',
+            'category',
+            'orders',
+            'units_sold',
+            'revenue',
+            'margin',
+            'margin_pct'
+        ],
+        'sql': """
+SELECT 
+    DATE_TRUNC('month', order_day)::DATE as month,
+    category,
+    CAST(SUM(orders) AS BIGINT) as orders,
+    CAST(SUM(units) AS BIGINT) as units_sold,
+    ROUND(SUM(revenue), 2) as revenue,
+    ROUND(SUM(margin), 2) as margin,
+    ROUND(SUM(margin) / SUM(revenue), 3) as margin_pct
+FROM agg_daily_sales
+WHERE grain = 'category'
+    AND ($status IS NULL OR order_status = $status)
+    AND ($date_from IS NULL OR order_day >= $date_from)
+    AND ($date_to IS NULL OR order_day <= $date_to)
+    AND ($categories IS NULL OR list_contains($categories, category))
+GROUP BY DATE_TRUNC('month', order_day), category
+ORDER BY month DESC, revenue DESC
+""",
+    },
+
+    'product_price_tiers': {
+        'title': 'Product Performance by Price Tier',
+        'description': 'Product performance segmented by price range',
+        'use_case': 'Price strategy and margin analysis',
+        'chart_type': 'Bar chart',
+        'file': 'product_price_tiers.sql',
+        'params': SALES_PARAMS,
+        'columns': [
+            'price_tier',
+            'product_count',
+            'orders',
+            'units_sold',
+            'revenue',
+            'avg_order_value',
+            'total_margin',
+            'margin_pct'
+        ],
+        'sql': """
+WITH tiers AS (
+    SELECT 
+        price_tier,
+        COUNT(DISTINCT product_id) FILTER (WHERE grain = 'product') as product_count,
+        CAST(SUM(orders) FILTER (WHERE grain = 'price_tier') AS BIGINT) as orders,
+        CAST(SUM(units) FILTER (WHERE grain = 'price_tier') AS BIGINT) as units_sold,
+        ROUND(SUM(revenue) FILTER (WHERE grain = 'price_tier'), 2) as revenue,
+        ROUND(SUM(revenue) FILTER (WHERE grain = 'price_tier')
+            / SUM(line_items) FILTER (WHERE grain = 'price_tier'), 2) as avg_order_value,
+        ROUND(SUM(margin) FILTER (WHERE grain = 'price_tier'), 2) as total_margin,
+        ROUND(100.0 * SUM(margin) FILTER (WHERE grain = 'price_tier')
+            / SUM(revenue) FILTER (WHERE grain = 'price_tier'), 1) as margin_pct
+    FROM agg_daily_sales
+    WHERE $categories IS NULL
+        AND grain IN ('product', 'price_tier')
+        AND ($status IS NULL OR order_status = $status)
+        AND ($date_from IS NULL OR order_day >= $date_from)
+        AND ($date_to IS NULL OR order_day <= $date_to)
+    GROUP BY price_tier
+    UNION ALL
+    -- The price_tier grain has no category, and summing the product grain
+    -- would count an order with several products in a tier once per
+    -- product, so a category filter aggregates the line items instead
+    SELECT 
+        CASE 
+            WHEN p.price < 50 THEN 'Budget (<$50)'
+            WHEN p.price < 150 THEN 'Mid-Range ($50-150)'
+            WHEN p.price < 300 THEN 'Premium ($150-300)'
+            ELSE 'Luxury ($300+)'
+        END as price_tier,
+        COUNT(DISTINCT o.product_id) as product_count,
+        COUNT(DISTINCT o.order_id) as orders,
+        CAST(SUM(o.quantity) AS BIGINT) as units_sold,
+        ROUND(SUM(o.line_total), 2) as revenue,
+        ROUND(SUM(o.line_total) / COUNT(*), 2) as avg_order_value,
+        ROUND(SUM(o.margin_dollars), 2) as total_margin,
+        ROUND(100.0 * SUM(o.margin_dollars) / SUM(o.line_total), 1) as margin_pct
+    FROM fct_orders o
+    JOIN dim_products p ON o.product_id = p.product_id
+    WHERE $categories IS NOT NULL
+        AND ($status IS NULL OR o.order_status = $status)
+        AND ($date_from IS NULL OR o.order_date >= $date_from)
+        AND ($date_to IS NULL OR o.order_date < CAST($date_to AS DATE) + 1)
+        AND list_contains($categories, p.category)
+    GROUP BY 1
+)
+SELECT * FROM tiers
+ORDER BY 
+    CASE 
+        WHEN price_tier = 'Budget (<$50)' THEN 1
+        WHEN price_tier = 'Mid-Range ($50-150)' THEN 2
+        WHEN price_tier = 'Premium ($150-300)' THEN 3
+        ELSE 4
+    END
+""",
+    }
+}
+
+# ============================================================================
+# SEGMENTED QUERIES
+# ============================================================================
+# The same queries computed for every segment at once (one dashboard per
+# country or per category): the segment is an extra GROUP BY key, so each
+# query scans its tables once however many segments there are. agg_daily_sales
+# has no user dimension, so the sales queries read fct_orders joined to
+# dim_products and dim_users instead.
+#
+# expr is the segment of an order line, values lists every segment, and
+# user_filter says which segments a user counts in (users have a country but
+# not a category, so for categories every user counts in every segment, as
+# with the category filter). Queries in skip can't be split by the segment
+# (events have no product) and are shared by all of its dashboards.
+SEGMENTS = {
+    'country': {
+        'expr': 'u.country',
+        'values': 'SELECT DISTINCT country as segment FROM dim_users',
+        'user_filter': 's.segment = u.country',
+        'skip': [],
+    },
+    'category': {
+        'expr': 'p.category',
+        'values': 'SELECT DISTINCT category as segment FROM dim_products',
+        'user_filter': 'TRUE',
+        'skip': ['event_funnel'],
+    },
+}
+
+# Filtered order lines with their segment, shared by the templates below
+SEGMENT_SALES = """sales AS (
+    SELECT
+        {expr} as segment,
+        o.order_id,
+        o.user_id,
+        o.product_id,
+        o.quantity,
+        o.line_total,
+        o.margin_dollars,
+        o.order_date,
+        p.name,
+        p.category,
+        p.price,
+        CASE 
+            WHEN p.price < 50 THEN 'Budget (<$50)'
+            WHEN p.price < 150 THEN 'Mid-Range ($50-150)'
+            WHEN p.price < 300 THEN 'Premium ($150-300)'
+            ELSE 'Luxury ($300+)'
+        END as price_tier
+    FROM fct_orders o
+    JOIN dim_products p ON o.product_id = p.product_id
+    JOIN dim_users u ON o.user_id = u.user_id
+    WHERE ($status IS NULL OR o.order_status = $status)
+        AND ($date_from IS NULL OR o.order_date >= $date_from)
+        AND ($date_to IS NULL OR o.order_date < CAST($date_to AS DATE) + 1)
+        AND ($categories IS NULL OR list_contains($categories, p.category))
+)"""
+
+# {sales}, {values}, {expr} and {user_filter} are filled in per segment. Rows
+# come out ordered by segment, then as the unsegmented query orders them.
+SEGMENTED_SQL = {
+    'revenue_by_category': """
+WITH {sales}
+SELECT 
+    segment,
+    category,
+    COUNT(DISTINCT order_id) as order_count,
+    COUNT(*) as line_items,
+    ROUND(SUM(line_total), 2) as revenue,
+    ROUND(SUM(line_total) / COUNT(*), 2) as avg_order_value,
+    ROUND(SUM(margin_dollars), 2) as total_margin
+FROM sales
+GROUP BY segment, category
+ORDER BY segment, revenue DESC
+""",
+
+    'top_products': """
+WITH {sales}
+SELECT 
+    segment,
+    product_id,
+    name,
+    category,
+    ROUND(price, 2) as price,
+    COUNT(DISTINCT order_id) as orders,
+    CAST(SUM(quantity) AS BIGINT) as units_sold,
+    ROUND(SUM(line_total), 2) as revenue,
+    ROUND(SUM(margin_dollars), 2) as total_margin,
+    ROUND(SUM(margin_dollars) / SUM(line_total), 3) as margin_pct
+FROM sales
+GROUP BY segment, product_id, name, category, price
+QUALIFY row_number() OVER (PARTITION BY segment ORDER BY SUM(line_total) DESC) <= 10
+ORDER BY segment, revenue DESC
+""",
+
+    'user_cohort': """
+WITH {sales}, segments AS ({values})
+SELECT 
+    s.segment,
+    CASE 
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 30 THEN '0-30 days'
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 90 THEN '31-90 days'
+        WHEN EXTRACT(DAY FROM (CURRENT_TIMESTAMP - u.created_at)) <= 180 THEN '91-180 days'
+        ELSE '180+ days'
+    END as cohort,
+    COUNT(DISTINCT u.user_id) as user_count,
+    COUNT(DISTINCT o.order_id) as total_orders,
+    ROUND(AVG(o.line_total), 2) as avg_order_value,
+    ROUND(SUM(o.line_total), 2) as total_revenue
+FROM dim_users u
+JOIN segments s ON {user_filter}
+LEFT JOIN sales o ON u.user_id = o.user_id AND o.segment = s.segment
+GROUP BY s.segment, cohort
+ORDER BY 
+    s.segment,
+    CASE 
+        WHEN cohort = '0-30 days' THEN 1
+        WHEN cohort = '31-90 days' THEN 2
+        WHEN cohort = '91-180 days' THEN 3
+        ELSE 4
+    END
+""",
+
+    'event_funnel': """
+WITH events AS (
+    SELECT {expr} as segment, e.user_id, e.event_type
+    FROM fct_events e
+    JOIN dim_users u ON e.user_id = u.user_id
+    WHERE ($date_from IS NULL OR e.event_date >= $date_from)
+        AND ($date_to IS NULL OR e.event_date < CAST($date_to AS DATE) + 1)
+),
+segment_users AS (
+    SELECT segment, COUNT(DISTINCT user_id) as users
+    FROM events
+    GROUP BY segment
+)
+SELECT 
+    e.segment,
+    e.event_type,
+    COUNT(DISTINCT e.user_id) as user_count,
+    COUNT(*) as event_count,
+    ROUND(100.0 * COUNT(DISTINCT e.user_id) / ANY_VALUE(t.users), 1) as pct_all_users
+FROM events e
+JOIN segment_users t ON e.segment = t.segment
+GROUP BY e.segment, e.event_type
+ORDER BY 
+    e.segment,
+    CASE 
+        WHEN e.event_type = 'page_view' THEN 1
+        WHEN e.event_type = 'product_view' THEN 2
+        WHEN e.event_type = 'search' THEN 3
+        WHEN e.event_type = 'add_to_cart' THEN 4
+        WHEN e.event_type = 'purchase' THEN 5
+        ELSE 6
+    END
+""",
+
+    'daily_revenue': """
+WITH {sales}
+SELECT 
+    segment,
+    CAST(order_date AS DATE) as order_date,
+    COUNT(DISTINCT order_id) as orders,
+    CAST(SUM(quantity) AS BIGINT) as units,
+    ROUND(SUM(line_total), 2) as revenue,
+    ROUND(SUM(margin_dollars), 2) as margin
+FROM sales
+GROUP BY segment, CAST(order_date AS DATE)
+ORDER BY segment, order_date DESC
+""",
+
+    'customer_lifetime_value': """
+WITH {sales}, segments AS ({values})
+SELECT 
+    s.segment,
+    u.user_id,
+    u.email,
+    u.created_at,
+    COUNT(DISTINCT o.order_id) as total_orders,
+    ROUND(SUM(o.line_total), 2) as lifetime_revenue,
+    ROUND(AVG(o.line_total), 2) as avg_order_value,
+    ROUND(SUM(o.margin_dollars), 2) as lifetime_margin,
+    ROUND(100.0 * SUM(o.margin_dollars) / SUM(o.line_total), 1) as margin_pct,
+    MAX(o.order_date) as last_purchase_date,
+    CAST(EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MAX(o.order_date))) AS INT) as days_since_last_order
+FROM dim_users u
+JOIN segments s ON {user_filter}
+LEFT JOIN sales o ON u.user_id = o.user_id AND o.segment = s.segment
+GROUP BY s.segment, u.user_id, u.email, u.created_at
+QUALIFY row_number() OVER (PARTITION BY s.segment ORDER BY SUM(o.line_total) DESC NULLS LAST) <= 100
+ORDER BY s.segment, lifetime_revenue DESC
+""",
+
+    'category_by_month': """
+WITH {sales}
+SELECT 
+    segment,
+    DATE_TRUNC('month', order_date)::DATE as month,
+    category,
+    COUNT(DISTINCT order_id) as orders,
+    CAST(SUM(quantity) AS BIGINT) as units_sold,
+    ROUND(SUM(line_total), 2) as revenue,
+    ROUND(SUM(margin_dollars), 2) as margin,
+    ROUND(SUM(margin_dollars) / SUM(line_total), 3) as margin_pct
+FROM sales
+GROUP BY segment, DATE_TRUNC('month', order_date), category
+ORDER BY segment, month DESC, revenue DESC
+""",
+
+    'product_price_tiers': """
+WITH {sales}
+SELECT 
+    segment,
+    price_tier,
+    COUNT(DISTINCT product_id) as product_count,
+    COUNT(DISTINCT order_id) as orders,
+    CAST(SUM(quantity) AS BIGINT) as units_sold,
+    ROUND(SUM(line_total), 2) as revenue,
+    ROUND(SUM(line_total) / COUNT(*), 2) as avg_order_value,
+    ROUND(SUM(margin_dollars), 2) as total_margin,
+    ROUND(100.0 * SUM(margin_dollars) / SUM(line_total), 1) as margin_pct
+FROM sales
+GROUP BY segment, price_tier
+ORDER BY 
+    segment,
+    CASE 
+        WHEN price_tier = 'Budget (<$50)' THEN 1
+        WHEN price_tier = 'Mid-Range ($50-150)' THEN 2
+        WHEN price_tier = 'Premium ($150-300)' THEN 3
+        ELSE 4
+    END
+""",
+}
+
+
+def segmented_query(name, segment):
+    """Registry entry for query name split by segment, registered as
+    <name>_by_<segment>: the same parameters, plus a leading segment
+    column."""
+    definition = SEGMENTS[segment]
+    sql = SEGMENTED_SQL[name].format(
+        sales=SEGMENT_SALES.format(expr=definition['expr']),
+        expr=definition['expr'],
+        values=definition['values'],
+        user_filter=definition['user_filter'],
+    )
+    return {
+        **QUERIES[name],
+        'title': f"{QUERIES[name]['title']} by {segment}",
+        'file': None,
+        'columns': ['segment'] + QUERIES[name]['columns'],
+        'sql': sql,
+    }
+
+
+SEGMENTED_QUERIES = {
+    f"{name}_by_{segment}": segmented_query(name, segment)
+    for segment, definition in SEGMENTS.items()
+    for name in SEGMENTED_SQL
+    if name not in definition['skip']
+}
+
+
+def get_query(name):
+    """Registry entry for a query or a segmented query."""
+    return QUERIES[name] if name in QUERIES else SEGMENTED_QUERIES[name]
+
+
+def sql_literal(value):
+    """Render a parameter value as a SQL literal. EXECUTE of a prepared
+    statement takes literal arguments, not bound parameters."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(sql_literal(item) for item in value) + ']'
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def filter_options(conn):
+    """Values the dashboards offer as filters: the order date range and the
+    categories and order statuses present in agg_daily_sales."""
+    date_min, date_max, categories, statuses = conn.execute("""
+        SELECT
+            MIN(order_day),
+            MAX(order_day),
+            LIST(DISTINCT category ORDER BY category) FILTER (WHERE category IS NOT NULL),
+            LIST(DISTINCT order_status ORDER BY order_status)
+        FROM agg_daily_sales
+    """).fetchone()
+    return {'date_min': date_min, 'date_max': date_max, 'categories': categories, 'statuses': statuses}
+
+
+class QueryRunner:
+    """Runs registry queries on one connection. Each statement is PREPAREd the
+    first time it runs on the connection and only EXECUTEd after that."""
+
+    def __init__(self, conn, cache=True):
+        self.conn = conn
+        self.cache = cache
+        self.prepared = set()
+        # Seconds each job of the last run_batch/run_many took, by key
+        self.latencies = {}
+
+    def bound_params(self, name, params=None):
+        """The query's declared parameters: its defaults overridden by the
+        matching entries of params (other entries are ignored)."""
+        declared = get_query(name)['params']
+        return {key: (params or {}).get(key, default) for key, default in declared.items()}
+
+    def execute(self, name, params=None):
+        """Run a query on the connection, bypassing the cache. Returns the
+        DuckDB result."""
+        if name not in self.prepared:
+            self.conn.execute(f"PREPARE {name} AS {get_query(name)['sql']}")
+            self.prepared.add(name)
+        values = self.bound_params(name, params)
+        if not values:
+            return self.conn.execute(f"EXECUTE {name}")
+        arguments = ', '.join(f"{key} := {sql_literal(value)}" for key, value in values.items())
+        return self.conn.execute(f"EXECUTE {name}({arguments})")
+
+    def run(self, name, params=None):
+        """Run a query, through the shared result cache unless disabled."""
+        if not self.cache:
+            return self.execute(name, params)
+        return cached_query(self.conn, get_query(name)['sql'], self.bound_params(name, params),
+                            execute=lambda: self.execute(name, params))
+
+    def run_batch(self, jobs, threads=1, arrow=False):
+        """Run {key: (name, params)} jobs and return {key: DataFrame}, or
+        {key: pyarrow.Table} with arrow=True. With threads > 1 the jobs run
+        concurrently, each worker thread on its own cursor (and so its own
+        prepared statements)."""
+        self.latencies = {}
+        threads = min(threads, len(jobs))
+        # Cursors are opened here and handed to the worker threads on first use
+        idle = queue.SimpleQueue()
+        for _ in range(threads if threads > 1 else 0):
+            idle.put(QueryRunner(self.conn.cursor(), self.cache))
+        workers = threading.local()
+
+        def run_job(key):
+            runner = self
+            if threads > 1:
+                if not hasattr(workers, 'runner'):
+                    workers.runner = idle.get()
+                runner = workers.runner
+            name, params = jobs[key]
+            start = time.perf_counter()
+            result = runner.run(name, params)
+            result = result.fetch_arrow_table() if arrow else result.df()
+            self.latencies[key] = time.perf_counter() - start
+            return result
+
+        if threads <= 1:
+            return {key: run_job(key) for key in jobs}
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return dict(zip(jobs, pool.map(run_job, jobs)))
+
+    def run_many(self, names=None, params=None, threads=1, arrow=False):
+        """Run several queries (default: all, in registry order) with the same
+        params and return {name: DataFrame} (or pyarrow.Table)."""
+        return self.run_batch({name: (name, params) for name in names or QUERIES}, threads, arrow)
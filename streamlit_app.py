@@ -7,23 +7,19 @@ import streamlit as st
 import duckdb
 import pandas as pd
 from pathlib import Path
+from datetime import timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 
+from downsample import downsample_df
+from query_registry import QueryRunner, filter_options
+
 # ============================================================================
 # CONFIG
 # ============================================================================
 st.set_page_config(page_title="eCommerce Analytics", layout="wide")
 PROJECT_DIR = Path(__file__).parent
 DB_PATH = PROJECT_DIR / "ecommerce.duckdb"
-QUERIES_DIR = PROJECT_DIR / "queries"
-
-# ============================================================================
-# LOAD QUERIES
-# ============================================================================
-def load_query(filename):
-    with open(QUERIES_DIR / filename, 'r') as f:
-        return f.read()
 
 # ============================================================================
 # PAGE HEADER
@@ -41,26 +37,76 @@ def get_connection():
 
 conn = get_connection()
 
-# Load all queries
-revenue_by_category_sql = load_query("revenue_by_category.sql")
-top_products_sql = load_query("top_products.sql")
-user_cohort_sql = load_query("user_cohort.sql")
-event_funnel_sql = load_query("event_funnel.sql")
-daily_revenue_sql = load_query("daily_revenue.sql")
+# Queries are prepared once on this connection and reused across reruns
+@st.cache_resource
+def get_runner():
+    return QueryRunner(conn)
+
+runner = get_runner()
 
 # ============================================================================
 # LOAD DATA
 # ============================================================================
+def current_data_versions():
+    """Versions the pipeline recorded for every model; they change only when
+    the pipeline actually changes data, which invalidates load_data below."""
+    try:
+        return tuple(conn.execute("SELECT relation_name, data_version FROM _model_state ORDER BY 1").fetchall())
+    except duckdb.Error:
+        return ()
+
 @st.cache_data
-def load_data():
-    revenue_by_cat = pd.read_df(conn.execute(revenue_by_category_sql))
-    top_products = pd.read_df(conn.execute(top_products_sql))
-    user_cohort = pd.read_df(conn.execute(user_cohort_sql))
-    event_funnel = pd.read_df(conn.execute(event_funnel_sql))
-    daily_revenue = pd.read_df(conn.execute(daily_revenue_sql))
-    return revenue_by_cat, top_products, user_cohort, event_funnel, daily_revenue
+def load_filter_options(data_versions):
+    return filter_options(conn)
 
-revenue_by_cat, top_products, user_cohort, event_funnel, daily_revenue = load_data()
+data_versions = current_data_versions()
+options = load_filter_options(data_versions)
+
+# ============================================================================
+# FILTERS
+# ============================================================================
+# Passed to the queries as bound parameters, so DuckDB filters in the scans
+# instead of the app filtering DataFrames afterwards
+st.sidebar.header("Filters")
+date_range = st.sidebar.date_input(
+    "Order date",
+    value=(options['date_min'], options['date_max']),
+    min_value=options['date_min'],
+    max_value=options['date_max']
+)
+categories = st.sidebar.multiselect("Category", options['categories'])
+# Defaults to completed orders, or to all when no order has that status
+status = st.sidebar.selectbox("Order status", ['all'] + options['statuses'],
+                              index=1 + options['statuses'].index('completed')
+                              if 'completed' in options['statuses'] else 0)
+trend_days = st.sidebar.number_input("Revenue trend days (0 = whole range)", min_value=0, value=30)
+
+# date_input returns a single date while a range is still being picked
+date_from, date_to = date_range if len(date_range) == 2 else (date_range[0], date_range[0])
+filters = {
+    'date_from': date_from,
+    'date_to': date_to,
+    'categories': categories or None,
+    'status': None if status == 'all' else status,
+}
+trend_filters = filters
+if trend_days:
+    trend_filters = {**filters, 'date_from': max(date_from, date_to - timedelta(days=trend_days - 1))}
+
+# Results come from the shared on-disk cache (also used by the HTML
+# dashboard); st.cache_data only keeps this session's copy, keyed by the
+# data versions so it is dropped after a pipeline run changes the models.
+@st.cache_data
+def load_data(data_versions, filters, trend_filters):
+    results = runner.run_many(['revenue_by_category', 'top_products', 'user_cohort', 'event_funnel'], filters)
+    return (results['revenue_by_category'], results['top_products'], results['user_cohort'],
+            results['event_funnel'], runner.run('daily_revenue', trend_filters).df())
+
+revenue_by_cat, top_products, user_cohort, event_funnel, daily_revenue = load_data(data_versions, filters, trend_filters)
+
+# A narrow date range or category can leave any result empty; every metric,
+# chart and insight below falls back to NO_DATA instead of failing.
+NO_DATA = "No data for this filter"
 
 # ============================================================================
 # METRICS ROW
@@ -77,8 +123,8 @@ with col2:
     st.metric("Total Orders", f"{total_orders:,.0f}")
 
 with col3:
-    avg_order_value = revenue_by_cat['avg_order_value'].mean()
-    st.metric("Avg Order Value", f"${avg_order_value:,.2f}")
+    avg_order_value = revenue_by_cat['avg_order_value'].mean() if not revenue_by_cat.empty else None
+    st.metric("Avg Order Value", f"${avg_order_value:,.2f}" if avg_order_value is not None else "n/a")
 
 with col4:
     total_margin = revenue_by_cat['total_margin'].sum()
@@ -94,24 +140,30 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("#### Revenue by Category")
-    fig_revenue = px.bar(
-        revenue_by_cat,
-        x='category',
-        y='revenue',
-        color='revenue',
-        title="Total Revenue by Category",
-        labels={'revenue': 'Revenue ($)', 'category': 'Category'},
-        color_continuous_scale="Viridis"
-    )
-    fig_revenue.update_layout(height=400, showlegend=False)
-    st.plotly_chart(fig_revenue, use_container_width=True)
+    if revenue_by_cat.empty:
+        st.info(NO_DATA)
+    else:
+        fig_revenue = px.bar(
+            revenue_by_cat,
+            x='category',
+            y='revenue',
+            color='revenue',
+            title="Total Revenue by Category",
+            labels={'revenue': 'Revenue ($)', 'category': 'Category'},
+            color_continuous_scale="Viridis"
+        )
+        fig_revenue.update_layout(height=400, showlegend=False)
+        st.plotly_chart(fig_revenue, use_container_width=True)
 
 with col2:
     st.markdown("#### Top 10 Products by Revenue")
-    top_10_display = top_products[['name', 'category', 'revenue', 'margin_pct']].copy()
-    top_10_display['revenue'] = top_10_display['revenue'].apply(lambda x: f"${x:,.0f}")
-    top_10_display['margin_pct'] = top_10_display['margin_pct'].apply(lambda x: f"{x*100:.1f}%")
-    st.dataframe(top_10_display, use_container_width=True, hide_index=True)
+    if top_products.empty:
+        st.info(NO_DATA)
+    else:
+        top_10_display = top_products[['name', 'category', 'revenue', 'margin_pct']].copy()
+        top_10_display['revenue'] = top_10_display['revenue'].apply(lambda x: f"${x:,.0f}")
+        top_10_display['margin_pct'] = top_10_display['margin_pct'].apply(lambda x: f"{x*100:.1f}%")
+        st.dataframe(top_10_display, use_container_width=True, hide_index=True)
 
 st.markdown("---")
 
@@ -123,44 +175,54 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("#### User Cohorts by Account Age")
-    fig_cohort = px.bar(
-        user_cohort,
-        x='cohort',
-        y=['user_count', 'total_orders'],
-        barmode='group',
-        title="Users & Orders by Cohort",
-        labels={'value': 'Count', 'cohort': 'Account Age Cohort'},
-        height=400
-    )
-    st.plotly_chart(fig_cohort, use_container_width=True)
+    if user_cohort.empty:
+        st.info(NO_DATA)
+    else:
+        fig_cohort = px.bar(
+            user_cohort,
+            x='cohort',
+            y=['user_count', 'total_orders'],
+            barmode='group',
+            title="Users & Orders by Cohort",
+            labels={'value': 'Count', 'cohort': 'Account Age Cohort'},
+            height=400
+        )
+        st.plotly_chart(fig_cohort, use_container_width=True)
 
 with col2:
     st.markdown("#### Event Funnel")
-    fig_funnel = go.Figure(data=[go.Funnel(
-        y=event_funnel['event_type'],
-        x=event_funnel['user_count'],
-        textposition="inside",
-        textinfo="value+percent initial"
-    )])
-    fig_funnel.update_layout(title="User Journey Funnel", height=400)
-    st.plotly_chart(fig_funnel, use_container_width=True)
+    if event_funnel.empty:
+        st.info(NO_DATA)
+    else:
+        fig_funnel = go.Figure(data=[go.Funnel(
+            y=event_funnel['event_type'],
+            x=event_funnel['user_count'],
+            textposition="inside",
+            textinfo="value+percent initial"
+        )])
+        fig_funnel.update_layout(title="User Journey Funnel", height=400)
+        st.plotly_chart(fig_funnel, use_container_width=True)
 
 st.markdown("---")
 
 # ============================================================================
 # ROW 3: DAILY REVENUE TREND
 # ============================================================================
-st.markdown("### 📅 Revenue Trend (Last 30 Days)")
-fig_trend = px.line(
-    daily_revenue.sort_values('order_date'),
-    x='order_date',
-    y='revenue',
-    title="Daily Revenue Trend",
-    labels={'revenue': 'Revenue ($)', 'order_date': 'Date'},
-    markers=True
-)
-fig_trend.update_layout(height=400)
-st.plotly_chart(fig_trend, use_container_width=True)
+st.markdown(f"### 📅 Revenue Trend ({f'Last {trend_days} Days' if trend_days else 'All Days'})")
+if daily_revenue.empty:
+    st.info(NO_DATA)
+else:
+    # Long ranges are downsampled (LTTB) to about one point per pixel
+    fig_trend = px.line(
+        downsample_df(daily_revenue.sort_values('order_date'), 'order_date', 'revenue'),
+        x='order_date',
+        y='revenue',
+        title="Daily Revenue Trend",
+        labels={'revenue': 'Revenue ($)', 'order_date': 'Date'},
+        markers=True
+    )
+    fig_trend.update_layout(height=400)
+    st.plotly_chart(fig_trend, use_container_width=True)
 
 st.markdown("---")
 
@@ -169,47 +231,61 @@ st.markdown("---")
 # ============================================================================
 st.markdown("### 💡 Key Insights")
 
+top_category = revenue_by_cat.loc[revenue_by_cat['revenue'].idxmax()] if not revenue_by_cat.empty else None
+top_product = top_products.iloc[0] if not top_products.empty else None
+newest_cohort = user_cohort.iloc[0] if not user_cohort.empty else None
+purchases = event_funnel.loc[event_funnel['event_type'] == 'purchase', 'user_count']
+purchase_users = purchases.iloc[0] if not purchases.empty else 0
+all_users = event_funnel['user_count'].max() if not event_funnel.empty else 0
+conversion = (purchase_users / all_users) * 100 if all_users else None
+
 insight_cols = st.columns(2)
 
 with insight_cols[0]:
-    top_category = revenue_by_cat.loc[revenue_by_cat['revenue'].idxmax()]
-    st.success(f"""
-    **🏆 Top Performing Category**
-    
-    {top_category['category']} leads with **${top_category['revenue']:,.0f}** in revenue
-    ({top_category['order_count']:.0f} orders, {top_category['total_margin']:,.0f} margin)
-    """)
+    if top_category is None:
+        st.info(NO_DATA)
+    else:
+        st.success(f"""
+        **🏆 Top Performing Category**
+        
+        {top_category['category']} leads with **${top_category['revenue']:,.0f}** in revenue
+        ({top_category['order_count']:.0f} orders, {top_category['total_margin']:,.0f} margin)
+        """)
 
 with insight_cols[1]:
-    top_product = top_products.iloc[0]
-    st.info(f"""
-    **⭐ Best Product**
-    
-    {top_product['name']} generated **${top_product['revenue']:,.0f}** in revenue
-    with {top_product['margin_pct']:.1%} margin ({top_product['units_sold']:.0f} units sold)
-    """)
+    if top_product is None:
+        st.info(NO_DATA)
+    else:
+        st.info(f"""
+        **⭐ Best Product**
+        
+        {top_product['name']} generated **${top_product['revenue']:,.0f}** in revenue
+        with {top_product['margin_pct']:.1%} margin ({top_product['units_sold']:.0f} units sold)
+        """)
 
 insight_cols2 = st.columns(2)
 
 with insight_cols2[0]:
-    newest_cohort = user_cohort.iloc[0]
-    st.warning(f"""
-    **📱 Newest Users (0-30 days)**
-    
-    {newest_cohort['user_count']:.0f} users, avg ${newest_cohort['avg_order_value']:,.2f}/order
-    Total revenue: ${newest_cohort['total_revenue']:,.0f}
-    """)
+    if newest_cohort is None:
+        st.info(NO_DATA)
+    else:
+        st.warning(f"""
+        **📱 Newest Users (0-30 days)**
+        
+        {newest_cohort['user_count']:.0f} users, avg ${newest_cohort['avg_order_value']:,.2f}/order
+        Total revenue: ${newest_cohort['total_revenue']:,.0f}
+        """)
 
 with insight_cols2[1]:
-    purchase_users = event_funnel[event_funnel['event_type'] == 'purchase']['user_count'].values[0]
-    all_users = event_funnel['user_count'].max()
-    conversion = (purchase_users / all_users) * 100
-    st.info(f"""
-    **🛒 Conversion Rate**
-    
-    {conversion:.1f}% of users completed a purchase
-    ({purchase_users:.0f} out of {all_users:.0f} total users)
-    """)
+    if conversion is None:
+        st.info(NO_DATA)
+    else:
+        st.info(f"""
+        **🛒 Conversion Rate**
+        
+        {conversion:.1f}% of users completed a purchase
+        ({purchase_users:.0f} out of {all_users:.0f} total users)
+        """)
 
 st.markdown("---")
 
@@ -218,7 +294,11 @@ st.markdown("---")
 # ============================================================================
 st.markdown("### 📝 Executive Summary")
 
-summary_text = f"""
+# The narrative quotes every insight above, so it needs all of them
+if any(value is None for value in (top_category, top_product, newest_cohort, conversion)) or not total_revenue:
+    st.info(NO_DATA)
+else:
+    summary_text = f"""
 This eCommerce analytics dashboard reveals a healthy and growing business:
 
 **Revenue Highlights:**
@@ -248,7 +328,7 @@ Built with dbt (data transformation), DuckDB (analytics), and Streamlit (visuali
 All models tested and documented for production readiness.
 """
 
-st.info(summary_text)
+    st.info(summary_text)
 
 st.markdown("---")
 st.markdown("**Dashboard generated on:** " + pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"))
\ No newline at end of file